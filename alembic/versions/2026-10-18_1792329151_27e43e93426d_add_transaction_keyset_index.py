@@ -0,0 +1,33 @@
+"""add transaction keyset index
+
+Revision ID: 27e43e93426d
+Revises: 53a70f304619
+Create Date: 2026-10-18 10:12:31.303096
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "27e43e93426d"
+down_revision: Union[str, None] = "53a70f304619"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_transaction_date_id",
+        "client_bottle_transaction",
+        ["transaction_date", "id_client_bottle_transaction"],
+        unique=False,
+        postgresql_where=sa.text("fl_active"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_transaction_date_id", table_name="client_bottle_transaction")
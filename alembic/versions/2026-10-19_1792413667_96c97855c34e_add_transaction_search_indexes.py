@@ -0,0 +1,60 @@
+"""add transaction search indexes
+
+Revision ID: 96c97855c34e
+Revises: 27e43e93426d
+Create Date: 2026-10-19 09:41:07.990665
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "96c97855c34e"
+down_revision: Union[str, None] = "27e43e93426d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public;
+
+        CREATE INDEX idx_client_full_name_trgm
+            ON client USING gin (
+                normalize_product_name(coalesce(name, '') || ' ' || coalesce(last_name, ''))
+                gin_trgm_ops
+            );
+
+        CREATE INDEX idx_client_phone_digits_trgm
+            ON client USING gin (regexp_replace(phone, '[^0-9]', '', 'g') gin_trgm_ops);
+
+        CREATE INDEX idx_transaction_recorded_by_trgm
+            ON client_bottle_transaction USING gin (normalize_product_name(recorded_by) gin_trgm_ops);
+        """
+    )
+    op.create_index(
+        op.f("ix_client_bottle_transaction_id_client"),
+        "client_bottle_transaction",
+        ["id_client"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_client_bottle_transaction_id_client"), table_name="client_bottle_transaction"
+    )
+    op.execute(
+        """
+        DROP INDEX idx_transaction_recorded_by_trgm;
+        DROP INDEX idx_client_phone_digits_trgm;
+        DROP INDEX idx_client_full_name_trgm;
+
+        DROP EXTENSION pg_trgm;
+        """
+    )
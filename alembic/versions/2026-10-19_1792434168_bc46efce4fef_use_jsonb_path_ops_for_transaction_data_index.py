@@ -0,0 +1,46 @@
+"""use jsonb_path_ops for transaction data index
+
+Revision ID: bc46efce4fef
+Revises: 96c97855c34e
+Create Date: 2026-10-19 15:22:48.918015
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "bc46efce4fef"
+down_revision: Union[str, None] = "96c97855c34e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index(
+        "idx_transaction_data_json", table_name="client_bottle_transaction", postgresql_using="gin"
+    )
+    op.create_index(
+        "idx_transaction_data_json",
+        "client_bottle_transaction",
+        ["transaction_data_json"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"transaction_data_json": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "idx_transaction_data_json", table_name="client_bottle_transaction", postgresql_using="gin"
+    )
+    op.create_index(
+        "idx_transaction_data_json",
+        "client_bottle_transaction",
+        ["transaction_data_json"],
+        unique=False,
+        postgresql_using="gin",
+    )
@@ -0,0 +1,76 @@
+"""store brand name in transaction data
+
+Revision ID: f46ca9ec955c
+Revises: bc46efce4fef
+Create Date: 2026-10-20 09:41:07.318204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f46ca9ec955c"
+down_revision: Union[str, None] = "bc46efce4fef"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def _rewrite_in_batches(item_expression: str) -> None:
+    """
+    Rewrites every item of `transaction_data_json` walking the primary key in chunks of
+    `BATCH_SIZE`, each one committed on its own so the table is never locked as a whole.
+    """
+    query = sa.text(
+        f"""
+        WITH batch AS (
+            SELECT id_client_bottle_transaction
+            FROM client_bottle_transaction
+            WHERE id_client_bottle_transaction > :last_id
+            AND jsonb_typeof(transaction_data_json) = 'array'
+            ORDER BY id_client_bottle_transaction
+            LIMIT :batch_size
+        )
+        UPDATE client_bottle_transaction cbt
+        SET transaction_data_json = (
+            SELECT coalesce(jsonb_agg({item_expression} ORDER BY items.position), '[]'::jsonb)
+            FROM jsonb_array_elements(cbt.transaction_data_json)
+                WITH ORDINALITY AS items(item, position)
+                LEFT JOIN bottle_brand bb
+                    ON bb.id_bottle_brand = (items.item ->> 'brand_id')::int
+        )
+        FROM batch
+        WHERE cbt.id_client_bottle_transaction = batch.id_client_bottle_transaction
+        RETURNING cbt.id_client_bottle_transaction
+        """
+    )
+    last_id = 0
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        while True:
+            ids = connection.execute(
+                query, {"last_id": last_id, "batch_size": BATCH_SIZE}
+            ).scalars()
+            last_id = max(ids, default=None)
+            if last_id is None:
+                break
+
+
+def upgrade() -> None:
+    _rewrite_in_batches(
+        """
+        CASE
+            WHEN bb.name IS NULL THEN items.item
+            ELSE items.item || jsonb_build_object('brand_name', bb.name)
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    _rewrite_in_batches("items.item - 'brand_name'")
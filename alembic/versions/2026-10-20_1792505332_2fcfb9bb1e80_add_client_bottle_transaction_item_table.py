@@ -0,0 +1,185 @@
+"""add client bottle transaction item table
+
+Revision ID: 2fcfb9bb1e80
+Revises: f46ca9ec955c
+Create Date: 2026-10-20 14:08:52.604117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2fcfb9bb1e80"
+down_revision: Union[str, None] = "f46ca9ec955c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    op.create_table(
+        "client_bottle_transaction_item",
+        sa.Column("id_client_bottle_transaction_item", sa.Integer(), nullable=False),
+        sa.Column("id_client_bottle_transaction", sa.Integer(), nullable=False),
+        sa.Column("id_client", sa.Integer(), nullable=False),
+        sa.Column("id_bottle_brand", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("transaction_date", sa.Date(), nullable=False),
+        sa.Column("fl_active", sa.Boolean(), server_default="true", nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("current_timestamp_brazil()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("current_timestamp_brazil()"),
+            nullable=True,
+        ),
+        sa.Column("creation_user_id", sa.Integer(), server_default="1", nullable=False),
+        sa.Column("update_user_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["id_client_bottle_transaction"],
+            ["client_bottle_transaction.id_client_bottle_transaction"],
+            name=op.f("fk_client_bottle_transaction_item_transaction"),
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_client"],
+            ["client.id_client"],
+            name=op.f("fk_client_bottle_transaction_item_id_client_client"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_bottle_brand"],
+            ["bottle_brand.id_bottle_brand"],
+            name=op.f("fk_client_bottle_transaction_item_id_bottle_brand_bottle_brand"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["creation_user_id"],
+            ["user.id_user"],
+            name=op.f("fk_client_bottle_transaction_item_creation_user_id_user"),
+        ),
+        sa.ForeignKeyConstraint(
+            ["update_user_id"],
+            ["user.id_user"],
+            name=op.f("fk_client_bottle_transaction_item_update_user_id_user"),
+        ),
+        sa.PrimaryKeyConstraint(
+            "id_client_bottle_transaction_item", name=op.f("pk_client_bottle_transaction_item")
+        ),
+    )
+
+    # Backfilled before the secondary indexes exist, one committed chunk of transactions at a
+    # time. Items pointing to brands that no longer exist are left out.
+    query = sa.text(
+        """
+        WITH batch AS (
+            SELECT id_client_bottle_transaction
+            FROM client_bottle_transaction
+            WHERE id_client_bottle_transaction > :last_id
+            ORDER BY id_client_bottle_transaction
+            LIMIT :batch_size
+        ), inserted AS (
+            INSERT INTO client_bottle_transaction_item (
+                id_client_bottle_transaction, id_client, id_bottle_brand, quantity,
+                transaction_date, fl_active, creation_user_id, update_user_id
+            )
+            SELECT cbt.id_client_bottle_transaction,
+                cbt.id_client,
+                bb.id_bottle_brand,
+                (items.item ->> 'quantity')::int,
+                cbt.transaction_date,
+                cbt.fl_active,
+                cbt.creation_user_id,
+                cbt.update_user_id
+            FROM batch
+                JOIN client_bottle_transaction cbt
+                    ON cbt.id_client_bottle_transaction = batch.id_client_bottle_transaction
+                CROSS JOIN LATERAL jsonb_array_elements(
+                    CASE
+                        WHEN jsonb_typeof(cbt.transaction_data_json) = 'array'
+                            THEN cbt.transaction_data_json
+                        ELSE '[]'::jsonb
+                    END
+                ) AS items(item)
+                JOIN bottle_brand bb ON bb.id_bottle_brand = (items.item ->> 'brand_id')::int
+            WHERE items.item ->> 'quantity' IS NOT NULL
+        )
+        SELECT max(id_client_bottle_transaction) FROM batch
+        """
+    )
+    last_id = 0
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        while True:
+            last_id = connection.execute(
+                query, {"last_id": last_id, "batch_size": BATCH_SIZE}
+            ).scalar()
+            if last_id is None:
+                break
+
+    op.create_index(
+        op.f("ix_client_bottle_transaction_item_id_client_bottle_transaction"),
+        "client_bottle_transaction_item",
+        ["id_client_bottle_transaction"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_client_bottle_transaction_item_id_bottle_brand"),
+        "client_bottle_transaction_item",
+        ["id_bottle_brand"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_client_bottle_transaction_item_creation_user_id"),
+        "client_bottle_transaction_item",
+        ["creation_user_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_client_bottle_transaction_item_update_user_id"),
+        "client_bottle_transaction_item",
+        ["update_user_id"],
+        unique=False,
+    )
+    op.create_index(
+        "idx_transaction_item_date_brand",
+        "client_bottle_transaction_item",
+        ["transaction_date", "id_bottle_brand"],
+        unique=False,
+    )
+    op.create_index(
+        "idx_transaction_item_client_brand",
+        "client_bottle_transaction_item",
+        ["id_client", "id_bottle_brand"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_transaction_item_client_brand", table_name="client_bottle_transaction_item")
+    op.drop_index("idx_transaction_item_date_brand", table_name="client_bottle_transaction_item")
+    op.drop_index(
+        op.f("ix_client_bottle_transaction_item_update_user_id"),
+        table_name="client_bottle_transaction_item",
+    )
+    op.drop_index(
+        op.f("ix_client_bottle_transaction_item_creation_user_id"),
+        table_name="client_bottle_transaction_item",
+    )
+    op.drop_index(
+        op.f("ix_client_bottle_transaction_item_id_bottle_brand"),
+        table_name="client_bottle_transaction_item",
+    )
+    op.drop_index(
+        op.f("ix_client_bottle_transaction_item_id_client_bottle_transaction"),
+        table_name="client_bottle_transaction_item",
+    )
+    op.drop_table("client_bottle_transaction_item")
@@ -0,0 +1,59 @@
+"""add client identity key
+
+Revision ID: 4809d4acbb8d
+Revises: 2fcfb9bb1e80
+Create Date: 2026-10-21 10:17:03.441957
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4809d4acbb8d"
+down_revision: Union[str, None] = "2fcfb9bb1e80"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        r"""
+        CREATE OR REPLACE FUNCTION client_identity_key(name TEXT, last_name TEXT) RETURNS TEXT AS
+        $$
+        SELECT regexp_replace(
+            trim(normalize_product_name(coalesce(name, '') || ' ' || coalesce(last_name, ''))),
+            '\s+', ' ', 'g'
+        )
+        $$ LANGUAGE sql IMMUTABLE
+                        PARALLEL SAFE;
+        """
+    )
+    op.add_column("client", sa.Column("identity_key", sa.String(), nullable=True))
+
+    # Clients that already share a key keep it NULL, except for the oldest one, until they
+    # are merged. Everything written from now on goes through the unique key.
+    op.execute(
+        """
+        UPDATE client c
+        SET identity_key = first_client.identity_key
+        FROM (
+            SELECT DISTINCT ON (client_identity_key(name, last_name))
+                id_client,
+                client_identity_key(name, last_name) AS identity_key
+            FROM client
+            ORDER BY client_identity_key(name, last_name), id_client
+        ) first_client
+        WHERE c.id_client = first_client.id_client
+        """
+    )
+    op.create_unique_constraint(op.f("uq_client_identity_key"), "client", ["identity_key"])
+
+
+def downgrade() -> None:
+    op.drop_constraint(op.f("uq_client_identity_key"), "client", type_="unique")
+    op.drop_column("client", "identity_key")
+    op.execute("DROP FUNCTION client_identity_key")
@@ -0,0 +1,45 @@
+"""notify bottle brand changes
+
+Revision ID: 517297203071
+Revises: 4809d4acbb8d
+Create Date: 2026-10-21 16:42:09.118420
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "517297203071"
+down_revision: Union[str, None] = "4809d4acbb8d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Statement level, so a bulk import that creates many brands sends a single notification.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_bottle_brand_changed() RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM pg_notify('bottle_brand_changed', TG_OP);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_bottle_brand_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON bottle_brand
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_bottle_brand_changed();
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER trg_bottle_brand_changed ON bottle_brand;")
+    op.execute("DROP FUNCTION notify_bottle_brand_changed;")
@@ -0,0 +1,56 @@
+"""unique normalized bottle brand name
+
+Revision ID: 5edc9197b304
+Revises: 517297203071
+Create Date: 2026-10-22 09:05:31.402117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5edc9197b304"
+down_revision: Union[str, None] = "517297203071"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    duplicates = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                """
+                SELECT normalize_product_name(name) AS normalized_name,
+                    string_agg(id_bottle_brand || ' (' || name || ')', ', '
+                               ORDER BY id_bottle_brand) AS brands
+                FROM bottle_brand
+                GROUP BY normalize_product_name(name)
+                HAVING count(*) > 1
+                ORDER BY normalized_name
+                """
+            )
+        )
+        .all()
+    )
+    if duplicates:
+        listing = "\n".join(f"  {row.normalized_name}: {row.brands}" for row in duplicates)
+        raise RuntimeError(
+            "Cannot create uq_bottle_brand_normalized_name: these brands only differ by case "
+            "or accents. Merge or rename them, then run the migration again:\n" + listing
+        )
+
+    op.execute(
+        """
+        CREATE UNIQUE INDEX uq_bottle_brand_normalized_name
+            ON bottle_brand (normalize_product_name(name));
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX uq_bottle_brand_normalized_name;")
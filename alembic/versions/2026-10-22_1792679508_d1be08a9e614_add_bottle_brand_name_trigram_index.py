@@ -0,0 +1,34 @@
+"""add bottle brand name trigram index
+
+Revision ID: d1be08a9e614
+Revises: 5edc9197b304
+Create Date: 2026-10-22 14:31:48.907361
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d1be08a9e614"
+down_revision: Union[str, None] = "5edc9197b304"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GiST rather than GIN: it serves both the prefix LIKE and the nearest-neighbour
+    # ORDER BY ... <-> ... LIMIT used by the brand suggestions.
+    op.execute(
+        """
+        CREATE INDEX idx_bottle_brand_name_trgm
+            ON bottle_brand USING gist (normalize_product_name(name) gist_trgm_ops);
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX idx_bottle_brand_name_trgm;")
@@ -0,0 +1,33 @@
+"""add client sort key index
+
+Revision ID: f56c6c2674e5
+Revises: d1be08a9e614
+Create Date: 2026-10-23 10:12:05.551902
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f56c6c2674e5"
+down_revision: Union[str, None] = "d1be08a9e614"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset key of GET /clients/: alphabetical by normalized full name, then id.
+    op.execute(
+        """
+        CREATE INDEX idx_client_sort_key
+            ON client (client_identity_key(name, last_name), id_client);
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX idx_client_sort_key;")
@@ -0,0 +1,81 @@
+"""add client phone normalized
+
+Revision ID: cdf6850ac264
+Revises: f56c6c2674e5
+Create Date: 2026-10-23 15:27:44.208311
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "cdf6850ac264"
+down_revision: Union[str, None] = "f56c6c2674e5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    # Brazilian numbers in E.164 (+55 DDD number). Leading zeros (trunk or international
+    # prefix) are dropped; anything that is not a full number with area code becomes NULL.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION normalize_phone_br(phone TEXT) RETURNS TEXT AS
+        $$
+        SELECT CASE
+            WHEN length(digits) IN (12, 13) AND digits LIKE '55%' THEN '+' || digits
+            WHEN length(digits) IN (10, 11) THEN '+55' || digits
+        END
+        FROM (
+            SELECT regexp_replace(regexp_replace(phone, '[^0-9]', '', 'g'), '^0+', '') AS digits
+        ) phone_digits
+        $$ LANGUAGE sql IMMUTABLE
+                        PARALLEL SAFE;
+        """
+    )
+    op.add_column("client", sa.Column("phone_normalized", sa.String(), nullable=True))
+
+    # Backfilled in committed chunks before the index exists.
+    query = sa.text(
+        """
+        WITH batch AS (
+            SELECT id_client
+            FROM client
+            WHERE id_client > :last_id
+            ORDER BY id_client
+            LIMIT :batch_size
+        ), updated AS (
+            UPDATE client c
+            SET phone_normalized = normalize_phone_br(c.phone)
+            FROM batch
+            WHERE c.id_client = batch.id_client
+            AND c.phone IS NOT NULL
+        )
+        SELECT max(id_client) FROM batch
+        """
+    )
+    last_id = 0
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        while True:
+            last_id = connection.execute(
+                query, {"last_id": last_id, "batch_size": BATCH_SIZE}
+            ).scalar()
+            if last_id is None:
+                break
+
+    op.create_index(
+        op.f("ix_client_phone_normalized"), "client", ["phone_normalized"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_client_phone_normalized"), table_name="client")
+    op.drop_column("client", "phone_normalized")
+    op.execute("DROP FUNCTION normalize_phone_br")
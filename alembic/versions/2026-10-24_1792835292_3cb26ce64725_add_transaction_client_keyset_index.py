@@ -0,0 +1,46 @@
+"""add transaction client keyset index
+
+Revision ID: 3cb26ce64725
+Revises: cdf6850ac264
+Create Date: 2026-10-24 09:48:12.730514
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3cb26ce64725"
+down_revision: Union[str, None] = "cdf6850ac264"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_transaction_client_date_id",
+        "client_bottle_transaction",
+        [
+            "id_client",
+            sa.text("transaction_date DESC"),
+            sa.text("id_client_bottle_transaction DESC"),
+        ],
+        unique=False,
+    )
+    # Covered by the leading column of the new index.
+    op.drop_index(
+        op.f("ix_client_bottle_transaction_id_client"), table_name="client_bottle_transaction"
+    )
+
+
+def downgrade() -> None:
+    op.create_index(
+        op.f("ix_client_bottle_transaction_id_client"),
+        "client_bottle_transaction",
+        ["id_client"],
+        unique=False,
+    )
+    op.drop_index("idx_transaction_client_date_id", table_name="client_bottle_transaction")
@@ -0,0 +1,150 @@
+"""add client brand balance table
+
+Revision ID: 06af81c1a3ae
+Revises: 3cb26ce64725
+Create Date: 2026-10-24 15:03:57.118642
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "06af81c1a3ae"
+down_revision: Union[str, None] = "3cb26ce64725"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "client_brand_balance",
+        sa.Column("id_client", sa.Integer(), nullable=False),
+        sa.Column("id_bottle_brand", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "last_movement_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("current_timestamp_brazil()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_client"],
+            ["client.id_client"],
+            name=op.f("fk_client_brand_balance_id_client_client"),
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["id_bottle_brand"],
+            ["bottle_brand.id_bottle_brand"],
+            name=op.f("fk_client_brand_balance_id_bottle_brand_bottle_brand"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint(
+            "id_client", "id_bottle_brand", name=op.f("pk_client_brand_balance")
+        ),
+    )
+    # Keyset keys of GET /balances/, with and without a brand.
+    op.execute(
+        """
+        CREATE INDEX idx_client_brand_balance_brand_quantity
+            ON client_brand_balance (id_bottle_brand, quantity DESC, id_client DESC);
+        CREATE INDEX idx_client_brand_balance_quantity
+            ON client_brand_balance (quantity DESC, id_client DESC, id_bottle_brand DESC);
+        """
+    )
+
+    # Items of active transactions are bottles still with the client; deactivating a
+    # transaction (the bottles came back) or deleting it takes them out of the balance. The
+    # triggers are statement-level so a bulk import or a client merge applies one aggregated
+    # delta per (client, brand) instead of one per item, and the rows are locked in key order
+    # so concurrent writers cannot deadlock on them. Edits that leave a balance unchanged do
+    # not touch its row.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION apply_client_brand_balance() RETURNS TRIGGER AS
+        $$
+        DECLARE
+            clients INT[];
+            brands INT[];
+            quantities INT[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(id_client), array_agg(id_bottle_brand), array_agg(quantity)
+                INTO clients, brands, quantities
+                FROM new_items
+                WHERE fl_active;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(id_client), array_agg(id_bottle_brand), array_agg(-quantity)
+                INTO clients, brands, quantities
+                FROM old_items
+                WHERE fl_active;
+            ELSE
+                SELECT array_agg(id_client), array_agg(id_bottle_brand), array_agg(quantity)
+                INTO clients, brands, quantities
+                FROM (
+                    SELECT id_client, id_bottle_brand, quantity FROM new_items WHERE fl_active
+                    UNION ALL
+                    SELECT id_client, id_bottle_brand, -quantity FROM old_items WHERE fl_active
+                ) changed;
+            END IF;
+
+            INSERT INTO client_brand_balance AS balance (id_client, id_bottle_brand, quantity)
+            SELECT id_client, id_bottle_brand, sum(quantity)
+            FROM unnest(clients, brands, quantities) AS delta(id_client, id_bottle_brand, quantity)
+            GROUP BY id_client, id_bottle_brand
+            HAVING sum(quantity) <> 0
+            ORDER BY id_client, id_bottle_brand
+            ON CONFLICT (id_client, id_bottle_brand) DO UPDATE
+            SET quantity = balance.quantity + excluded.quantity,
+                last_movement_at = excluded.last_movement_at;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER trg_client_brand_balance_insert
+            AFTER INSERT ON client_bottle_transaction_item
+            REFERENCING NEW TABLE AS new_items
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_client_brand_balance();
+        CREATE TRIGGER trg_client_brand_balance_update
+            AFTER UPDATE ON client_bottle_transaction_item
+            REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_client_brand_balance();
+        CREATE TRIGGER trg_client_brand_balance_delete
+            AFTER DELETE ON client_bottle_transaction_item
+            REFERENCING OLD TABLE AS old_items
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_client_brand_balance();
+        """
+    )
+
+    # The triggers already hold a lock that keeps writers out until this migration commits,
+    # so the initial load cannot miss or double count a concurrent change.
+    op.execute(
+        """
+        INSERT INTO client_brand_balance (id_client, id_bottle_brand, quantity, last_movement_at)
+        SELECT id_client,
+            id_bottle_brand,
+            sum(quantity) FILTER (WHERE fl_active),
+            max(coalesce(updated_at, created_at))
+        FROM client_bottle_transaction_item
+        GROUP BY id_client, id_bottle_brand
+        HAVING sum(quantity) FILTER (WHERE fl_active) <> 0;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        DROP TRIGGER trg_client_brand_balance_delete ON client_bottle_transaction_item;
+        DROP TRIGGER trg_client_brand_balance_update ON client_bottle_transaction_item;
+        DROP TRIGGER trg_client_brand_balance_insert ON client_bottle_transaction_item;
+        DROP FUNCTION apply_client_brand_balance;
+        """
+    )
+    op.drop_index("idx_client_brand_balance_quantity", table_name="client_brand_balance")
+    op.drop_index("idx_client_brand_balance_brand_quantity", table_name="client_brand_balance")
+    op.drop_table("client_brand_balance")
@@ -0,0 +1,128 @@
+"""add bottle brand stock table
+
+Revision ID: 1d08fbc9a7bc
+Revises: 06af81c1a3ae
+Create Date: 2026-10-25 10:41:12.530187
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "1d08fbc9a7bc"
+down_revision: Union[str, None] = "06af81c1a3ae"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bottle_brand_stock",
+        sa.Column("id_bottle_brand", sa.Integer(), nullable=False),
+        sa.Column("stripe", sa.SmallInteger(), nullable=False),
+        sa.Column("lent", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("returned", sa.BigInteger(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(
+            ["id_bottle_brand"],
+            ["bottle_brand.id_bottle_brand"],
+            name=op.f("fk_bottle_brand_stock_id_bottle_brand_bottle_brand"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id_bottle_brand", "stripe", name=op.f("pk_bottle_brand_stock")),
+    )
+
+    # Every item counts as lent; items of inactive transactions also count as returned.
+    # Each brand has up to 16 counter rows and a connection always adds to the same one
+    # (picked by its backend pid), so concurrent writers of a popular brand do not queue on a
+    # single row lock. Readers sum the stripes. Deltas are aggregated per statement and
+    # applied in brand order, like `apply_client_brand_balance`.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION apply_bottle_brand_stock() RETURNS TRIGGER AS
+        $$
+        DECLARE
+            brands INT[];
+            lent_deltas BIGINT[];
+            returned_deltas BIGINT[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(id_bottle_brand),
+                    array_agg(quantity),
+                    array_agg(CASE WHEN fl_active THEN 0 ELSE quantity END)
+                INTO brands, lent_deltas, returned_deltas
+                FROM new_items;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(id_bottle_brand),
+                    array_agg(-quantity),
+                    array_agg(CASE WHEN fl_active THEN 0 ELSE -quantity END)
+                INTO brands, lent_deltas, returned_deltas
+                FROM old_items;
+            ELSE
+                SELECT array_agg(id_bottle_brand),
+                    array_agg(quantity),
+                    array_agg(CASE WHEN fl_active THEN 0 ELSE quantity END)
+                INTO brands, lent_deltas, returned_deltas
+                FROM (
+                    SELECT id_bottle_brand, quantity, fl_active FROM new_items
+                    UNION ALL
+                    SELECT id_bottle_brand, -quantity, fl_active FROM old_items
+                ) changed;
+            END IF;
+
+            INSERT INTO bottle_brand_stock AS stock (id_bottle_brand, stripe, lent, returned)
+            SELECT id_bottle_brand, pg_backend_pid() % 16, sum(lent), sum(returned)
+            FROM unnest(brands, lent_deltas, returned_deltas)
+                AS delta(id_bottle_brand, lent, returned)
+            GROUP BY id_bottle_brand
+            HAVING sum(lent) <> 0 OR sum(returned) <> 0
+            ORDER BY id_bottle_brand
+            ON CONFLICT (id_bottle_brand, stripe) DO UPDATE
+            SET lent = stock.lent + excluded.lent,
+                returned = stock.returned + excluded.returned;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER trg_bottle_brand_stock_insert
+            AFTER INSERT ON client_bottle_transaction_item
+            REFERENCING NEW TABLE AS new_items
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_bottle_brand_stock();
+        CREATE TRIGGER trg_bottle_brand_stock_update
+            AFTER UPDATE ON client_bottle_transaction_item
+            REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_bottle_brand_stock();
+        CREATE TRIGGER trg_bottle_brand_stock_delete
+            AFTER DELETE ON client_bottle_transaction_item
+            REFERENCING OLD TABLE AS old_items
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_bottle_brand_stock();
+        """
+    )
+
+    # Loaded into stripe 0 while the new triggers keep item writers out.
+    op.execute(
+        """
+        INSERT INTO bottle_brand_stock (id_bottle_brand, stripe, lent, returned)
+        SELECT id_bottle_brand,
+            0,
+            sum(quantity),
+            coalesce(sum(quantity) FILTER (WHERE NOT fl_active), 0)
+        FROM client_bottle_transaction_item
+        GROUP BY id_bottle_brand;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        DROP TRIGGER trg_bottle_brand_stock_delete ON client_bottle_transaction_item;
+        DROP TRIGGER trg_bottle_brand_stock_update ON client_bottle_transaction_item;
+        DROP TRIGGER trg_bottle_brand_stock_insert ON client_bottle_transaction_item;
+        DROP FUNCTION apply_bottle_brand_stock;
+        """
+    )
+    op.drop_table("bottle_brand_stock")
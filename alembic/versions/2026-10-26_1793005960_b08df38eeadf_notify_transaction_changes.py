@@ -0,0 +1,49 @@
+"""notify transaction changes
+
+Revision ID: b08df38eeadf
+Revises: 1d08fbc9a7bc
+Create Date: 2026-10-26 09:12:40.207514
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b08df38eeadf"
+down_revision: Union[str, None] = "1d08fbc9a7bc"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Notifications are delivered on commit and identical ones are folded within a
+    # transaction, so an import or a merge job sends a single one.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_transaction_changed() RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM pg_notify('transaction_changed', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    # The transaction pages show client names and phones, so client writes count too.
+    for table in ("client_bottle_transaction", "client"):
+        op.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_transaction_changed
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_transaction_changed();
+            """
+        )
+
+
+def downgrade() -> None:
+    for table in ("client_bottle_transaction", "client"):
+        op.execute(f"DROP TRIGGER trg_{table}_transaction_changed ON {table};")
+    op.execute("DROP FUNCTION notify_transaction_changed;")
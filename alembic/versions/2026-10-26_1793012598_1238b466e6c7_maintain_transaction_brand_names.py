@@ -0,0 +1,104 @@
+"""maintain transaction brand names
+
+Revision ID: 1238b466e6c7
+Revises: b08df38eeadf
+Create Date: 2026-10-26 11:03:18.644021
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "1238b466e6c7"
+down_revision: Union[str, None] = "b08df38eeadf"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    # Whatever name the writer sent (possibly from a stale worker cache), the stored
+    # `brand_name` is the one `bottle_brand` holds when the row is written. No lock is taken on
+    # the brands: writes that raced a rename are repaired by `propagate_bottle_brand_name`.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION set_transaction_brand_names() RETURNS TRIGGER AS $$
+        BEGIN
+            IF jsonb_typeof(NEW.transaction_data_json) IS DISTINCT FROM 'array' THEN
+                RETURN NEW;
+            END IF;
+            NEW.transaction_data_json := (
+                SELECT coalesce(
+                    jsonb_agg(
+                        CASE
+                            WHEN bb.name IS NULL THEN items.item
+                            ELSE items.item || jsonb_build_object('brand_name', bb.name)
+                        END
+                        ORDER BY items.position
+                    ),
+                    '[]'::jsonb
+                )
+                FROM jsonb_array_elements(NEW.transaction_data_json)
+                    WITH ORDINALITY AS items(item, position)
+                    LEFT JOIN bottle_brand bb
+                        ON bb.id_bottle_brand = (items.item ->> 'brand_id')::int
+            );
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trg_client_bottle_transaction_brand_names
+        BEFORE INSERT OR UPDATE OF transaction_data_json ON client_bottle_transaction
+        FOR EACH ROW EXECUTE FUNCTION set_transaction_brand_names();
+        """
+    )
+
+    # Repairs the rows written with an outdated name before the trigger existed, walking the
+    # primary key in chunks committed on their own, once the trigger is committed.
+    query = sa.text(
+        """
+        WITH batch AS (
+            SELECT id_client_bottle_transaction
+            FROM client_bottle_transaction
+            WHERE id_client_bottle_transaction > :last_id
+            ORDER BY id_client_bottle_transaction
+            LIMIT :batch_size
+        ), repaired AS (
+            UPDATE client_bottle_transaction cbt
+            SET transaction_data_json = cbt.transaction_data_json
+            FROM batch
+            WHERE cbt.id_client_bottle_transaction = batch.id_client_bottle_transaction
+            AND jsonb_typeof(cbt.transaction_data_json) = 'array'
+            AND EXISTS (
+                SELECT 1
+                FROM jsonb_array_elements(cbt.transaction_data_json) AS items(item)
+                    JOIN bottle_brand bb
+                        ON bb.id_bottle_brand = (items.item ->> 'brand_id')::int
+                WHERE items.item ->> 'brand_name' IS DISTINCT FROM bb.name
+            )
+        )
+        SELECT max(id_client_bottle_transaction) FROM batch
+        """
+    )
+    last_id = 0
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        while last_id is not None:
+            last_id = connection.execute(
+                query, {"last_id": last_id, "batch_size": BATCH_SIZE}
+            ).scalar()
+
+
+def downgrade() -> None:
+    op.execute(
+        "DROP TRIGGER trg_client_bottle_transaction_brand_names ON client_bottle_transaction;"
+    )
+    op.execute("DROP FUNCTION set_transaction_brand_names;")
@@ -35,12 +35,13 @@ BEGIN
                             pg_index i
                             JOIN pg_attribute a ON a.attrelid = i.indrelid
                                 AND a.attnum = ANY (i.indkey)
-                        WHERE i.indrelid = tablename::REGCLASS AND i.indisprimary
+                        WHERE i.indrelid = tablename::REGCLASS AND i.indisprimary AND i.indnatts = 1
                     ) AS idname
                 FROM
                     pg_catalog.pg_tables
                 WHERE schemaname = 'public' AND tablename != 'alembic_version'
             ) _
+        WHERE idname IS NOT NULL
         LOOP
             EXECUTE query_row.query_row;
         END LOOP;
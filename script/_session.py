@@ -0,0 +1,32 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.model.user import User
+from server.utils.types import SessionPayload
+
+
+async def load_session_payload(session: AsyncSession, id_user: int) -> SessionPayload:
+    """
+    Builds the payload the API would get from the user's token, so command line jobs go
+    through the same service code and keep the user as the author of their writes.
+    """
+    user = (await session.execute(select(User).where(User.id_user == id_user))).scalars().first()
+    if not user:
+        raise SystemExit(f"User {id_user} not found")
+    return SessionPayload(
+        id_user=user.id_user,
+        username=user.username,
+        full_name=user.full_name,
+        email=user.email,
+        creation_user_id=user.creation_user_id,
+        update_user_id=user.update_user_id,
+        fl_active=user.fl_active,
+        role=user.role,
+        created_at=user.created_at,
+        updated_at=user.updated_at,
+        jti=str(uuid.uuid4()),
+        exp=datetime.now() + timedelta(hours=1),
+    )
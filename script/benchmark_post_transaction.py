@@ -0,0 +1,95 @@
+"""
+Throughput benchmark for the POST /transaction/ write path.
+
+Drives `_TransactionService.post_transaction` directly against the configured database and
+reports requests per second, latency percentiles and SQL statements per request. It writes
+real rows (clients named `bench-*`), so point it at a disposable database:
+
+    python -m script.benchmark_post_transaction --requests 500 --concurrency 8
+
+Run it on both sides of a change to compare them.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import event
+
+from script._session import load_session_payload
+from server.configuration.database import AsyncSessionLocal, async_engine
+from server.schema.transaction_schema import BottleBrandInput, TransactionCreateInput
+from server.service.client_bottle_transaction_service import _TransactionService
+from server.utils.types import SessionPayload
+
+statement_count = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statement_count
+    statement_count += 1
+
+
+def _transaction_input(index: int, brands: int) -> TransactionCreateInput:
+    return TransactionCreateInput(
+        client_name=f"bench-{uuid.uuid4().hex[:8]}",
+        last_name=f"run-{index}",
+        client_phone=None,
+        transaction_data=[
+            BottleBrandInput(brand_name=f"bench-brand-{brand}", quantity=1)
+            for brand in range(brands)
+        ],
+    )
+
+
+async def _post(user: SessionPayload, index: int, brands: int) -> float:
+    async with AsyncSessionLocal() as session:
+        started = time.perf_counter()
+        await _TransactionService(session).post_transaction(
+            _transaction_input(index, brands), user
+        )
+        return time.perf_counter() - started
+
+
+async def run(requests: int, concurrency: int, brands: int, id_user: int):
+    async with AsyncSessionLocal() as session:
+        user = await load_session_payload(session, id_user)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index: int) -> float:
+        async with semaphore:
+            return await _post(user, index, brands)
+
+    # Warm-up creates the benchmark brands so every measured request takes the same path.
+    await _post(user, -1, brands)
+
+    global statement_count
+    statement_count = 0
+    started = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(bounded(i) for i in range(requests))))
+    elapsed = time.perf_counter() - started
+
+    print(f"requests:          {requests} (concurrency {concurrency}, {brands} items each)")
+    print(f"throughput:        {requests / elapsed:.1f} req/s")
+    print(f"latency p50:       {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"latency p95:       {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+    print(f"statements/req:    {statement_count / requests:.1f}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--brands", type=int, default=3, help="Items per transaction")
+    parser.add_argument("--user-id", type=int, default=1, help="Existing user recorded as author")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.brands, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Checks the per-brand stock counters against the transaction items.
+
+The totals of every brand are recomputed from `client_bottle_transaction_item` and compared
+with the sum of its counter stripes. Differences are printed and the command exits with
+status 1; `--fix` also replaces the stripes of those brands with the recomputed totals:
+
+    python -m script.check_bottle_brand_stock
+    python -m script.check_bottle_brand_stock --fix
+"""
+
+import argparse
+import asyncio
+import sys
+
+from server.configuration.database import AsyncSessionLocal, async_engine
+from server.service.bottle_brand_service import _BottleBrandService
+
+
+async def check(fix: bool) -> bool:
+    async with AsyncSessionLocal() as session:
+        diffs = await _BottleBrandService(session).check_bottle_brand_stock(fix)
+    await async_engine.dispose()
+
+    for diff in diffs:
+        print(
+            f"{diff.id_bottle_brand} {diff.name}: lent {diff.lent} (expected "
+            f"{diff.expected_lent}), returned {diff.returned} (expected {diff.expected_returned})"
+        )
+    if not diffs:
+        print("All stock counters match the transaction items")
+    elif fix:
+        print(f"Stock counters of {len(diffs)} brands fixed")
+    return not diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--fix", action="store_true", help="Rewrite the counters of the brands that differ"
+    )
+    args = parser.parse_args()
+    consistent = asyncio.run(check(args.fix))
+    if not consistent and not args.fix:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Concurrency check for brand renames against transaction writes.
+
+Seeds a brand used by `--transactions` transactions, then renames it through
+`_BottleBrandService.update_bottle_brand` while:
+- an insert of a transaction of that brand, and an update moving a transaction to it, store
+  the old name before the rename commits and stay open for `--hold` seconds, past the
+  rename's walk over the transactions. They stop short of the items: an item takes a key
+  share lock on its brand, which the rename waits for, so this is the window in which a
+  write can race it;
+- `--parallel` sessions keep posting and updating transactions of the brand, each for a
+  client of its own.
+
+Every write must succeed (no deadlock) and, once the rename returns, every transaction must
+carry the new name. The seeded rows are removed at the end. Run it against a disposable
+database:
+
+    python -m script.check_brand_rename_race --transactions 5000 --parallel 8
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import List, Tuple
+
+from sqlalchemy import bindparam, delete, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import Integer
+
+from script._session import load_session_payload
+from server.configuration.database import AsyncSessionLocal, async_engine
+from server.model.bottle_brand import BottleBrand
+from server.model.client import Client
+from server.model.client_bottle_transaction import ClientBottleTransaction
+from server.schema.bottle_brand_schema import BottleBrandUpdate
+from server.schema.transaction_schema import (
+    BottleBrandInput,
+    TransactionCreateInput,
+    TransactionUpdateInput,
+)
+from server.service.bottle_brand_service import _BottleBrandService
+from server.service.client_bottle_transaction_service import _TransactionService
+from server.utils.types import SessionPayload
+
+SEED_QUERY = text(
+    """
+    INSERT INTO client_bottle_transaction (id_client, recorded_by, transaction_data_json)
+    SELECT :id_client, 'rename-check', jsonb_build_array(
+        jsonb_build_object('brand_id', :id_bottle_brand, 'quantity', 1)
+    )
+    FROM generate_series(1, :rows)
+    RETURNING id_client_bottle_transaction
+    """
+)
+
+# The transaction row a PUT writes before replacing its items, with the name of a stale cache.
+# It moves a transaction of the other brand to the renamed one, so the rename cannot see it.
+HELD_UPDATE_QUERY = text(
+    """
+    UPDATE client_bottle_transaction
+    SET transaction_data_json = jsonb_build_array(
+        jsonb_build_object(
+            'brand_id', :id_bottle_brand, 'brand_name', CAST(:name AS text), 'quantity', 5
+        )
+    )
+    WHERE id_client_bottle_transaction = :id_client_bottle_transaction
+    """
+)
+
+# Items of the brand whose stored name differs from the brand's.
+STALE_QUERY = text(
+    """
+    SELECT count(*)
+    FROM client_bottle_transaction cbt
+        CROSS JOIN LATERAL jsonb_array_elements(cbt.transaction_data_json) AS items(item)
+        JOIN bottle_brand bb ON bb.id_bottle_brand = (items.item ->> 'brand_id')::int
+    WHERE cbt.id_client = ANY(:clients)
+    AND items.item ->> 'brand_name' IS DISTINCT FROM bb.name
+    """
+).bindparams(bindparam("clients", type_=ARRAY(Integer)))
+
+
+def _input(client: Client, id_bottle_brand: int) -> TransactionCreateInput:
+    return TransactionCreateInput(
+        client_name=client.name,
+        last_name=client.last_name,
+        transaction_data=[BottleBrandInput(brand_id=id_bottle_brand, quantity=2)],
+    )
+
+
+def _update(id_bottle_brand: int, quantity: int) -> TransactionUpdateInput:
+    return TransactionUpdateInput(
+        transaction_data=[BottleBrandInput(brand_id=id_bottle_brand, quantity=quantity)]
+    )
+
+
+async def _seed(
+    user: SessionPayload, suffix: str, clients: int, rows: int
+) -> Tuple[List[int], List[Client], List[List[int]]]:
+    """
+    Creates the brand to rename, another brand, and `clients` clients sharing `rows`
+    transactions of the first one, except the second client whose transactions hold the other
+    brand. Writes of one client queue on its balance rows, so every writing session gets a
+    client of its own.
+    """
+    async with AsyncSessionLocal() as session:
+        brands = [
+            BottleBrand(name=f"Rename Check {suffix}", creation_user_id=user.id_user),
+            BottleBrand(name=f"Other Check {suffix}", creation_user_id=user.id_user),
+        ]
+        session.add_all(brands)
+        await session.flush()
+        brand_ids = [brand.id_bottle_brand for brand in brands]
+        repository = _TransactionService(session).repository
+        seeded_clients, seeded_ids = [], []
+        for number in range(clients):
+            data = TransactionCreateInput(
+                client_name="Rename",
+                last_name=f"Check {suffix} {number}",
+                transaction_data=[BottleBrandInput(brand_id=brand_ids[0], quantity=1)],
+            )
+            client = await repository.get_or_post_client(data, user)
+            params = {
+                "id_client": client.id_client,
+                "id_bottle_brand": brand_ids[number == 1],
+                "rows": rows // clients,
+            }
+            seeded_clients.append(client)
+            seeded_ids.append((await session.scalars(SEED_QUERY, params)).all())
+        await session.commit()
+        return brand_ids, seeded_clients, seeded_ids
+
+
+async def _hold_open(ready: asyncio.Event, release: asyncio.Event, query, params: dict):
+    """
+    Runs `query` in its own session and commits only once `release` is set.
+    """
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(query, params)
+        finally:
+            ready.set()
+        await release.wait()
+        await session.commit()
+
+
+async def _writer(
+    user: SessionPayload, client: Client, id_bottle_brand: int, ids: List[int], stop: asyncio.Event
+) -> int:
+    writes = 0
+    while not stop.is_set():
+        async with AsyncSessionLocal() as session:
+            service = _TransactionService(session)
+            if writes % 2:
+                await service.post_transaction(_input(client, id_bottle_brand), user)
+            else:
+                await service.update_transaction(
+                    random.choice(ids), _update(id_bottle_brand, 3), user
+                )
+        writes += 1
+    return writes
+
+
+async def _wait_for_name(id_bottle_brand: int, name: str):
+    async with AsyncSessionLocal() as session:
+        query = select(BottleBrand.name).where(BottleBrand.id_bottle_brand == id_bottle_brand)
+        while await session.scalar(query) != name:
+            await session.rollback()
+            await asyncio.sleep(0.01)
+
+
+async def run(rows: int, parallel: int, hold: float, id_user: int):
+    async with AsyncSessionLocal() as session:
+        user = await load_session_payload(session, id_user)
+    suffix = uuid.uuid4().hex[:8]
+    brand_ids, clients, ids = await _seed(user, suffix, parallel + 2, rows)
+    id_bottle_brand = brand_ids[0]
+    new_name = f"Renamed Check {suffix}"
+    client_ids = [client.id_client for client in clients]
+    release, stop = asyncio.Event(), asyncio.Event()
+    held, writers = [], []
+
+    try:
+        held_writes = [
+            (
+                SEED_QUERY,
+                {
+                    "id_client": clients[0].id_client,
+                    "id_bottle_brand": id_bottle_brand,
+                    "rows": 1,
+                },
+            ),
+            (
+                HELD_UPDATE_QUERY,
+                {
+                    "id_bottle_brand": id_bottle_brand,
+                    "name": f"Rename Check {suffix}",
+                    "id_client_bottle_transaction": ids[1][len(ids[1]) // 2],
+                },
+            ),
+        ]
+        ready = [asyncio.Event() for _ in held_writes]
+        held += [
+            asyncio.create_task(_hold_open(event, release, *write))
+            for event, write in zip(ready, held_writes)
+        ]
+        await asyncio.gather(*(event.wait() for event in ready))
+        for task in held:
+            if task.done():
+                task.result()
+        writers += [
+            asyncio.create_task(_writer(user, clients[number], id_bottle_brand, ids[number], stop))
+            for number in range(2, parallel + 2)
+        ]
+
+        async def rename() -> float:
+            async with AsyncSessionLocal() as session:
+                started = time.perf_counter()
+                await _BottleBrandService(session).update_bottle_brand(
+                    user, BottleBrandUpdate(id_bottle_brand=id_bottle_brand, new_name=new_name)
+                )
+                return time.perf_counter() - started
+
+        renaming = asyncio.create_task(rename())
+        # The held writes stored the old name. They commit after the rename's walk went past
+        # them, or after `hold` seconds if the rename does not wait for them.
+        await _wait_for_name(id_bottle_brand, new_name)
+        await asyncio.wait([renaming], timeout=hold)
+        release.set()
+        await asyncio.gather(*held)
+        elapsed = await renaming
+        stop.set()
+        writes = sum(await asyncio.gather(*writers))
+
+        async with AsyncSessionLocal() as session:
+            stale = await session.scalar(STALE_QUERY, {"clients": client_ids})
+            total = await session.scalar(
+                select(func.count())
+                .select_from(ClientBottleTransaction)
+                .where(ClientBottleTransaction.id_client.in_(client_ids))
+            )
+        assert stale == 0, f"{stale} items still carry an outdated brand name"
+        print(
+            f"ok: renamed in {elapsed * 1000:.0f} ms with 2 held writes and {writes} concurrent "
+            f"writes; none of the {total} transactions holds an outdated brand name"
+        )
+    finally:
+        # A failed check must not leave sessions writing the rows being removed.
+        release.set()
+        stop.set()
+        await asyncio.gather(*held, *writers, return_exceptions=True)
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                delete(ClientBottleTransaction).where(
+                    ClientBottleTransaction.id_client.in_(client_ids)
+                )
+            )
+            await session.execute(delete(Client).where(Client.id_client.in_(client_ids)))
+            await session.execute(
+                delete(BottleBrand).where(BottleBrand.id_bottle_brand.in_(brand_ids))
+            )
+            await session.commit()
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=5000, help="Seeded transactions")
+    parser.add_argument("--parallel", type=int, default=8, help="Concurrent writing sessions")
+    parser.add_argument(
+        "--hold", type=float, default=3.0, help="Seconds the held writes stay open at most"
+    )
+    parser.add_argument("--user-id", type=int, default=1, help="Existing user recorded as author")
+    args = parser.parse_args()
+    asyncio.run(run(args.transactions, args.parallel, args.hold, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
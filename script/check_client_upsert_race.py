@@ -0,0 +1,73 @@
+"""
+Concurrency check for the client upsert used by POST /transaction/.
+
+Fires parallel `get_or_post_client` calls for the same brand-new client, each on its own
+session, and asserts that exactly one client row exists afterwards. The client is removed
+at the end. Run it against a disposable database:
+
+    python -m script.check_client_upsert_race --parallel 20
+"""
+
+import argparse
+import asyncio
+import uuid
+
+from sqlalchemy import delete, func, select
+
+from script._session import load_session_payload
+from server.configuration.database import AsyncSessionLocal, async_engine
+from server.model.client import Client
+from server.repository.client_bottle_transaction_repository import _TransactionRepository
+from server.schema.transaction_schema import BottleBrandInput, TransactionCreateInput
+from server.utils.types import SessionPayload
+
+
+async def _upsert(data: TransactionCreateInput, user: SessionPayload) -> int:
+    async with AsyncSessionLocal() as session:
+        client = await _TransactionRepository(session).get_or_post_client(data, user)
+        await session.commit()
+        return client.id_client
+
+
+async def run(parallel: int, id_user: int):
+    async with AsyncSessionLocal() as session:
+        user = await load_session_payload(session, id_user)
+
+    suffix = uuid.uuid4().hex[:8]
+    # Spelling variants of the same person must collapse into a single row.
+    variants = [
+        TransactionCreateInput(
+            client_name=name,
+            last_name=f"Race {suffix}",
+            transaction_data=[BottleBrandInput(brand_id=1, quantity=1)],
+        )
+        for name in ("José", "jose", " JOSE ", "Jose")
+    ]
+    ids = await asyncio.gather(
+        *(_upsert(variants[i % len(variants)], user) for i in range(parallel))
+    )
+
+    async with AsyncSessionLocal() as session:
+        key = func.client_identity_key("jose", f"race {suffix}")
+        rows = await session.scalar(
+            select(func.count()).select_from(Client).where(Client.identity_key == key)
+        )
+        await session.execute(delete(Client).where(Client.identity_key == key))
+        await session.commit()
+    await async_engine.dispose()
+
+    assert len(set(ids)) == 1, f"parallel upserts returned different clients: {set(ids)}"
+    assert rows == 1, f"expected exactly one client row, found {rows}"
+    print(f"ok: {parallel} parallel upserts resolved to client {ids[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--parallel", type=int, default=20)
+    parser.add_argument("--user-id", type=int, default=1, help="Existing user recorded as author")
+    args = parser.parse_args()
+    asyncio.run(run(args.parallel, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
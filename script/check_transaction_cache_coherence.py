@@ -0,0 +1,172 @@
+"""
+Coherence check for the transaction page cache across workers.
+
+Starts two worker processes, each with its own `transaction_page_cache` and the LISTEN
+connection the API opens at startup, and has both cache the page of a new client. A
+transaction is then posted through the first worker, and another one is written from this
+process the way the command line jobs do, without touching any cache. After each write both
+workers must serve the new total within `--timeout` seconds. The client and its
+transactions are removed at the end. Run it against a disposable database:
+
+    python -m script.check_transaction_cache_coherence
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+import uuid
+from typing import List, Tuple
+
+from sqlalchemy import delete
+
+from script._session import load_session_payload
+from server.configuration.database import AsyncSessionLocal, async_engine
+from server.model.client import Client
+from server.model.client_bottle_transaction import ClientBottleTransaction
+from server.schema.transaction_schema import (
+    BottleBrandInput,
+    TransactionCreateInput,
+    TransactionFilters,
+)
+from server.service.client_bottle_transaction_service import _TransactionService
+from server.utils.brand_catalog import brand_catalog
+from server.utils.cache import transaction_page_cache
+
+WORKERS = ("worker-1", "worker-2")
+# A worker that crashed never replies; fail instead of waiting forever.
+REPLY_TIMEOUT = 30
+
+
+async def _serve(commands: multiprocessing.Queue, replies: multiprocessing.Queue, timeout: float):
+    brand_catalog.start()
+    deadline = time.monotonic() + timeout
+    while not transaction_page_cache.enabled:
+        if time.monotonic() > deadline:
+            raise SystemExit("the LISTEN connection did not come up")
+        await asyncio.sleep(0.05)
+    replies.put(None)
+
+    while True:
+        command, *args = await asyncio.to_thread(commands.get)
+        if command == "stop":
+            break
+        async with AsyncSessionLocal() as session:
+            service = _TransactionService(session)
+            if command == "read":
+                page = await service.get_paginated_transactions(
+                    1, 50, TransactionFilters(client_id=args[0])
+                )
+                replies.put(page.total)
+            elif command == "post":
+                transaction = await service.post_transaction(*args)
+                replies.put(transaction.id_client_bottle_transaction)
+    await brand_catalog.stop()
+    await async_engine.dispose()
+
+
+def _worker(commands: multiprocessing.Queue, replies: multiprocessing.Queue, timeout: float):
+    asyncio.run(_serve(commands, replies, timeout))
+
+
+def _call(worker: Tuple[multiprocessing.Queue, multiprocessing.Queue], *command):
+    commands, replies = worker
+    commands.put(command)
+    return replies.get(timeout=REPLY_TIMEOUT)
+
+
+def _wait_for_total(workers: List, client_id: int, expected: int, timeout: float) -> float:
+    """
+    Reads the page on every worker until all of them show `expected` transactions and returns
+    how long that took.
+    """
+    started = time.monotonic()
+    while True:
+        totals = [_call(worker, "read", client_id) for worker in workers]
+        if all(total == expected for total in totals):
+            return time.monotonic() - started
+        assert time.monotonic() - started < timeout, (
+            f"workers disagree after {timeout}s: {dict(zip(WORKERS, totals))}, "
+            f"expected {expected}"
+        )
+        time.sleep(0.02)
+
+
+async def _create_client(data: TransactionCreateInput, id_user: int):
+    async with AsyncSessionLocal() as session:
+        user = await load_session_payload(session, id_user)
+        client = await _TransactionService(session).repository.get_or_post_client(data, user)
+        await session.commit()
+    # Every `asyncio.run` gets its own loop, so pooled connections must not outlive it.
+    await async_engine.dispose()
+    return user, client.id_client
+
+
+async def _write_without_cache(data: TransactionCreateInput, user):
+    # What script.import_transactions and the merge job do: write and commit directly.
+    async with AsyncSessionLocal() as session:
+        await _TransactionService(session)._create_transaction(data, user)
+        await session.commit()
+    await async_engine.dispose()
+
+
+async def _cleanup(client_id: int):
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            delete(ClientBottleTransaction).where(ClientBottleTransaction.id_client == client_id)
+        )
+        await session.execute(delete(Client).where(Client.id_client == client_id))
+        await session.commit()
+    await async_engine.dispose()
+
+
+def run(id_user: int, timeout: float):
+    data = TransactionCreateInput(
+        client_name="Cache",
+        last_name=f"Check {uuid.uuid4().hex[:8]}",
+        transaction_data=[BottleBrandInput(brand_id=1, quantity=1)],
+    )
+    user, client_id = asyncio.run(_create_client(data, id_user))
+
+    context = multiprocessing.get_context("spawn")
+    workers, processes = [], []
+    for _ in WORKERS:
+        worker = (context.Queue(), context.Queue())
+        process = context.Process(target=_worker, args=(*worker, timeout), daemon=True)
+        process.start()
+        workers.append(worker)
+        processes.append(process)
+    try:
+        for _, replies in workers:
+            replies.get(timeout=timeout + REPLY_TIMEOUT)
+
+        # Twice, so the second read is served from each worker's cache.
+        _wait_for_total(workers, client_id, 0, timeout)
+        _wait_for_total(workers, client_id, 0, timeout)
+
+        _call(workers[0], "post", data, user)
+        elapsed = _wait_for_total(workers, client_id, 1, timeout)
+        print(f"post through {WORKERS[0]}: both workers agree after {elapsed * 1000:.0f} ms")
+
+        asyncio.run(_write_without_cache(data, user))
+        elapsed = _wait_for_total(workers, client_id, 2, timeout)
+        print(f"write outside the API: both workers agree after {elapsed * 1000:.0f} ms")
+    finally:
+        for commands, _ in workers:
+            commands.put(("stop",))
+        for process in processes:
+            process.join(timeout=10)
+        asyncio.run(_cleanup(client_id))
+    print("ok: the transaction page cache is coherent across workers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", type=int, default=1, help="Existing user recorded as author")
+    parser.add_argument("--timeout", type=float, default=2.0, help="Seconds to wait per write")
+    args = parser.parse_args()
+    run(args.user_id, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Plan check for the `date_from` / `date_to` filter of GET /transaction/.
+
+Seeds a large `client_bottle_transaction` table, analyzes it and runs `EXPLAIN (FORMAT JSON)`
+on the queries the repository builds for a one-month range: the keyset page and the count of
+the offset listing. Both must reach the transactions through `idx_transaction_date` or
+`idx_transaction_date_id` (Index, Index Only or Bitmap Index Scan) and never scan
+`client_bottle_transaction` sequentially; the joined client rows may be read either way.
+Everything runs in one transaction that is rolled back, so the seeded rows and statistics are
+discarded:
+
+    python -m script.check_transaction_date_plan --rows 200000
+"""
+
+import argparse
+import asyncio
+import json
+from datetime import date
+from typing import Dict, Iterator, List
+
+from fastapi_pagination.ext.sqlalchemy import create_count_query
+from sqlalchemy import Select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.configuration.database import AsyncSessionLocal, async_engine
+from server.model.client_bottle_transaction import ClientBottleTransaction
+from server.repository.client_bottle_transaction_repository import _TransactionRepository
+from server.schema.transaction_schema import TransactionFilters
+
+DATE_INDEXES = {"idx_transaction_date", "idx_transaction_date_id"}
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+TRANSACTION_TABLE = ClientBottleTransaction.__tablename__
+
+# Ten years of transactions spread over a thousand clients, 90% of them active.
+SEED_QUERY = text(
+    """
+    WITH clients AS (
+        INSERT INTO client (name, last_name)
+        SELECT 'plan-check', 'client ' || n
+        FROM generate_series(1, 1000) n
+        RETURNING id_client
+    ), numbered AS (
+        SELECT id_client, row_number() OVER () AS n FROM clients
+    )
+    INSERT INTO client_bottle_transaction (
+        id_client, transaction_date, recorded_by, fl_active, transaction_data_json
+    )
+    SELECT numbered.id_client,
+        DATE '2016-01-01' + (seq.i * 7919 % 3650)::int,
+        'plan-check',
+        seq.i % 10 <> 0,
+        jsonb_build_array(jsonb_build_object('brand_id', 1, 'quantity', 1))
+    FROM generate_series(1, :rows) AS seq(i)
+        JOIN numbered ON numbered.n = seq.i % 1000 + 1
+    """
+)
+
+
+def _plan_nodes(node: Dict) -> Iterator[Dict]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def _explain(session: AsyncSession, query: Select) -> List[Dict]:
+    compiled = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = await session.scalar(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return list(_plan_nodes(plan[0]["Plan"]))
+
+
+def _check(name: str, nodes: List[Dict]):
+    summary = ", ".join(
+        " on ".join(
+            filter(None, (node["Node Type"], node.get("Index Name") or node.get("Relation Name")))
+        )
+        for node in nodes
+    )
+    print(f"{name}: {summary}")
+    seq_scans = [
+        node
+        for node in nodes
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == TRANSACTION_TABLE
+    ]
+    assert not seq_scans, f"{name} scans {TRANSACTION_TABLE} sequentially"
+    date_scans = [
+        node
+        for node in nodes
+        if node["Node Type"] in INDEX_SCANS and node.get("Index Name") in DATE_INDEXES
+    ]
+    assert date_scans, f"{name} does not use {' or '.join(sorted(DATE_INDEXES))}"
+
+
+async def run(rows: int, date_from: date, date_to: date):
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(SEED_QUERY, {"rows": rows})
+            await session.execute(text(f"ANALYZE client, {TRANSACTION_TABLE}"))
+
+            repository = _TransactionRepository(session)
+            filters = TransactionFilters(date_from=date_from, date_to=date_to)
+            query, _ = await repository._filter_transactions(
+                repository._select_transactions(), filters
+            )
+            page_query = query.order_by(
+                ClientBottleTransaction.transaction_date.desc(),
+                ClientBottleTransaction.id_client_bottle_transaction.desc(),
+            ).limit(21)
+
+            _check("keyset page", await _explain(session, page_query))
+            _check("count", await _explain(session, create_count_query(query)))
+        finally:
+            await session.rollback()
+    await async_engine.dispose()
+    print(f"ok: {date_from} to {date_to} is served by a date index over {rows} transactions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="Transactions to seed")
+    parser.add_argument("--date-from", type=date.fromisoformat, default=date(2020, 3, 1))
+    parser.add_argument("--date-to", type=date.fromisoformat, default=date(2020, 3, 31))
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.date_from, args.date_to))
+
+
+if __name__ == "__main__":
+    main()
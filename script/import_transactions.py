@@ -0,0 +1,46 @@
+"""
+Command line counterpart of POST /transaction/bulk.
+
+Imports a JSON array or a CSV file (format taken from the extension) through the same
+service code as the endpoint and prints the result:
+
+    python -m script.import_transactions historico.csv --user-id 1
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from script._session import load_session_payload
+from server.configuration.database import AsyncSessionLocal, async_engine
+from server.schema.transaction_schema import ImportFormat
+from server.service.client_bottle_transaction_service import _TransactionService
+
+
+async def run(path: Path, id_user: int):
+    payload_format = ImportFormat.CSV if path.suffix.lower() == ".csv" else ImportFormat.JSON
+    async with AsyncSessionLocal() as session:
+        user = await load_session_payload(session, id_user)
+        result = await _TransactionService(session).bulk_create_transactions(
+            path.read_bytes(), payload_format, user
+        )
+    await async_engine.dispose()
+
+    for error in result.errors:
+        print(f"row {error.row}: {error.detail}")
+    print(
+        f"{result.imported} of {result.received} transactions imported, {result.failed} failed "
+        f"({result.elapsed_seconds}s, {result.rows_per_second} rows/s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", type=Path, help="JSON array or CSV file")
+    parser.add_argument("--user-id", type=int, required=True, help="User recorded as author")
+    args = parser.parse_args()
+    asyncio.run(run(args.path, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Finds and merges duplicate clients.
+
+`detect` writes the candidate clusters to a JSON file. Clusters whose names only differ by
+case, accents or spacing come with `"approved": true`; review the others and flip the flag
+(or change `keep_id`) before merging. `merge` moves the transactions of every approved
+cluster to its kept client in batches and deletes the duplicates:
+
+    python -m script.merge_duplicate_clients detect clusters.json
+    python -m script.merge_duplicate_clients merge clusters.json --user-id 1
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+from script._session import load_session_payload
+from server.configuration.database import AsyncSessionLocal, async_engine
+from server.schema.client_schema import ClientDuplicateCluster
+from server.service.client_service import _ClientService
+
+
+async def detect(path: Path, min_similarity: float, phone_min_similarity: float, max_block: int):
+    async with AsyncSessionLocal() as session:
+        report = await _ClientService(session).find_duplicate_clusters(
+            min_similarity, phone_min_similarity, max_block
+        )
+    await async_engine.dispose()
+
+    path.write_text(
+        json.dumps(
+            [cluster.model_dump() for cluster in report.clusters], indent=2, ensure_ascii=False
+        )
+    )
+    approved = sum(cluster.approved for cluster in report.clusters)
+    print(
+        f"{len(report.clusters)} clusters ({approved} approved) among {report.clients} clients "
+        f"written to {path}"
+    )
+    if report.skipped_blocks:
+        print(f"{report.skipped_blocks} blocks over {max_block} clients were skipped")
+    print(f"{report.elapsed_seconds}s ({report.seconds_per_100k_clients}s per 100k clients)")
+
+
+async def merge(path: Path, id_user: int, batch_size: int):
+    clusters = [ClientDuplicateCluster(**cluster) for cluster in json.loads(path.read_text())]
+    async with AsyncSessionLocal() as session:
+        user = await load_session_payload(session, id_user)
+        result = await _ClientService(session).merge_duplicate_clusters(user, clusters, batch_size)
+    await async_engine.dispose()
+
+    print(
+        f"{result.clients_merged} clients merged into {result.clusters}, "
+        f"{result.transactions_moved} transactions and {result.items_moved} items moved "
+        f"({result.elapsed_seconds}s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    detect_parser = commands.add_parser("detect", help="Write candidate clusters to a file")
+    detect_parser.add_argument("path", type=Path)
+    detect_parser.add_argument(
+        "--min-similarity", type=float, default=0.8, help="Trigram similarity of the names"
+    )
+    detect_parser.add_argument(
+        "--phone-min-similarity",
+        type=float,
+        default=0.5,
+        help="Lower name similarity accepted when the phones match",
+    )
+    detect_parser.add_argument(
+        "--max-block", type=int, default=5000, help="Skip blocks larger than this"
+    )
+
+    merge_parser = commands.add_parser("merge", help="Merge the approved clusters of a file")
+    merge_parser.add_argument("path", type=Path)
+    merge_parser.add_argument("--user-id", type=int, required=True, help="User recorded as author")
+    merge_parser.add_argument("--batch-size", type=int, default=5000)
+
+    args = parser.parse_args()
+    if args.command == "detect":
+        asyncio.run(
+            detect(args.path, args.min_similarity, args.phone_min_similarity, args.max_block)
+        )
+    else:
+        asyncio.run(merge(args.path, args.user_id, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Recomputes `client_brand_balance` from the transaction items.
+
+The triggers keep the balances in step with every write; this is the repair path for when
+they were bypassed (disabled triggers, manual fixes, restores of a single table). Only the
+rows that differ are rewritten. `--check` reports the differences without fixing them and
+exits with status 1 when there are any:
+
+    python -m script.rebuild_client_balances
+    python -m script.rebuild_client_balances --check
+"""
+
+import argparse
+import asyncio
+import sys
+
+from server.configuration.database import AsyncSessionLocal, async_engine
+from server.service.balance_service import _BalanceService
+
+
+async def rebuild(check: bool) -> bool:
+    async with AsyncSessionLocal() as session:
+        result = await _BalanceService(session).rebuild_balances(dry_run=check)
+    await async_engine.dispose()
+
+    verb = "wrong" if check else "corrected"
+    print(
+        f"{result.corrected} balances {verb}, {result.removed} "
+        f"{'stale' if check else 'removed'} ({result.elapsed_seconds}s)"
+    )
+    return not (result.corrected or result.removed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--check", action="store_true", help="Only report the balances that differ"
+    )
+    args = parser.parse_args()
+    consistent = asyncio.run(rebuild(args.check))
+    if args.check and not consistent:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
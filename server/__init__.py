@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
@@ -5,13 +7,16 @@ from fastapi.security import HTTPBearer, OAuth2PasswordBearer
 
 from server.configuration.environment import SETTINGS
 from server.controller.auth_controller import router as auth_router
+from server.controller.balance_controller import router as balance_router
 from server.controller.bottle_brand_controller import router as bottle_brand_router
+from server.controller.client_controller import router as client_router
 from server.controller.invite_controller import router as invite_router
 from server.controller.recover_password_controller import router as recover_password_router
 from server.controller.server_controller import router as server_router
 from server.controller.transaction_controller import report_router
 from server.controller.transaction_controller import router as transaction_router
 from server.controller.transaction_controller import router_test as transaction_router_test
+from server.utils.brand_catalog import brand_catalog
 from server.utils.exceptions import add_exception_handlers, add_http_exception_handlers
 from server.utils.handler import setup_marketplace_exception_handling
 from server.utils.logger import logger
@@ -44,6 +49,8 @@ def _config_app_routes(app: FastAPI) -> FastAPI:
         transaction_router,
         report_router,
         bottle_brand_router,
+        client_router,
+        balance_router,
         server_router,
         transaction_router_test,
     ]
@@ -52,8 +59,16 @@ def _config_app_routes(app: FastAPI) -> FastAPI:
     return app
 
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    brand_catalog.start()
+    yield
+    await brand_catalog.stop()
+
+
 def _get_app_args() -> dict:
     return dict(
+        lifespan=_lifespan,
         title="Bottle",
         description="Bottle API",
         # root_path=SETTINGS.root_path,
@@ -32,6 +32,18 @@ class Environment(BaseSettings):
 
     frontend_url: str
 
+    transaction_count_cache_ttl: int = 60
+    transaction_cache_size: int = 512
+    transaction_cache_ttl: int = 30
+    transaction_cache_serve_stale: bool = False
+    transaction_export_batch_size: int = 1000
+    transaction_bulk_max_rows: int = 50000
+    bottle_brand_cache_size: int = 2048
+    bottle_brand_cache_ttl: int = 300
+    bottle_brand_listen_retry_seconds: int = 5
+    bottle_brand_suggest_min_similarity: float = 0.3
+    bottle_brand_duplicate_similarity: float = 0.6
+
     def render_sqlalchemy_url(self, dialect_and_connector: str):
         user = quote_plus(self.postgres_user)
         password = quote_plus(self.postgres_password)
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from server.schema.balance_schema import BalanceCursorPage, ClientBalanceOutput
+from server.service.balance_service import BalanceService
+from server.utils.dependencies import DepUserPayload
+
+router = APIRouter(tags=["Balance"])
+
+
+@router.get(
+    "/clients/{client_id}/balance",
+    summary="Get Client Balance",
+    response_model=ClientBalanceOutput,
+)
+async def get_client_balance(user: DepUserPayload, service: BalanceService, client_id: int):
+    """
+    Bottles of each brand the client still holds, i.e. the quantities of their active
+    transactions, largest first.
+    """
+    return await service.get_client_balance(user, client_id)
+
+
+@router.get(
+    "/balances/",
+    summary="List Balances",
+    response_model=BalanceCursorPage,
+)
+async def get_balances(
+    user: DepUserPayload,
+    service: BalanceService,
+    brand_id: Optional[int] = Query(None, description="Only balances of this brand"),
+    min_qty: int = Query(1, ge=1, description="Smallest balance listed"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned by a previous page"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    Client balances per brand, largest first. Pass `next_cursor` back to get the next page;
+    every page costs the same as the first one.
+    """
+    return await service.get_balances(user, limit, min_qty, brand_id, cursor)
@@ -1,15 +1,18 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Query, status
+from fastapi import APIRouter, Header, Query, Response, status
 
 from server.schema.bottle_brand_schema import (
     BottleBrandCreate,
     BottleBrandInput,
     BottleBrandOutput,
+    BottleBrandStockOutput,
+    BottleBrandSuggestion,
     BottleBrandUpdate,
 )
 from server.service.bottle_brand_service import BottleBrandService
 from server.utils.dependencies import DepUserPayload
+from server.utils.utils import etag_matches
 
 router = APIRouter(tags=["Bottle Brand"])
 
@@ -30,9 +33,47 @@ async def create_bottle_brand(
     "/bottle-brands/",
     summary="Get All Bottle Brands",
     response_model=List[BottleBrandOutput],
+    responses={304: {"description": "A lista não mudou desde o ETag informado."}},
 )
-async def get_all_bottle_brands(user: DepUserPayload, service: BottleBrandService):
-    return await service.get_all_bottle_brands(user)
+async def get_all_bottle_brands(
+    user: DepUserPayload,
+    service: BottleBrandService,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+):
+    brands, etag = await service.get_bottle_brand_catalog(user)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return brands
+
+
+@router.get(
+    "/bottle-brands/stock",
+    summary="Get Bottle Brand Stock",
+    response_model=List[BottleBrandStockOutput],
+)
+async def get_bottle_brand_stock(user: DepUserPayload, service: BottleBrandService):
+    """
+    Bottles lent, returned and still with clients for every brand, kept up to date as
+    transactions are written.
+    """
+    return await service.get_bottle_brand_stock(user)
+
+
+@router.get(
+    "/bottle-brand/suggest",
+    summary="Suggest Bottle Brands",
+    response_model=List[BottleBrandSuggestion],
+)
+async def suggest_bottle_brands(
+    user: DepUserPayload,
+    service: BottleBrandService,
+    q: str = Query(..., min_length=1, description="Início ou parte do nome da marca."),
+    limit: int = Query(10, ge=1, le=50),
+):
+    return await service.suggest_bottle_brands(user, q, limit)
 
 
 @router.get(
@@ -45,9 +86,12 @@ async def get_bottle_brand(
     service: BottleBrandService,
     id_bottle_brand: int = Query(None),
     name: str = Query(None),
+    fuzzy: bool = Query(
+        False, description="Busca a marca cujo nome contém `name` em vez do nome exato."
+    ),
 ):
     data = BottleBrandInput(id_bottle_brand=id_bottle_brand, name=name)
-    return await service.get_bottle_brand(user, data)
+    return await service.get_bottle_brand(user, data, fuzzy)
 
 
 @router.patch(
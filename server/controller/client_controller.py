@@ -0,0 +1,86 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Query
+
+from server.schema.client_schema import ClientCursorPage, ClientOutput, ClientUpdateInput
+from server.schema.transaction_schema import TransactionCursorPage
+from server.service.client_service import ClientService
+from server.utils.dependencies import DepUserPayload
+
+router = APIRouter(tags=["Client"])
+
+
+@router.get(
+    "/clients/",
+    summary="List Clients",
+    response_model=ClientCursorPage,
+)
+async def get_clients(
+    user: DepUserPayload,
+    service: ClientService,
+    term: Optional[str] = Query(None, description="Nome, sobrenome ou telefone"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned by a previous page"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Lists clients in alphabetical order with the number of transactions of each one.
+
+    - `term`: Matches the name and last name (ignoring case and accents) and, when it has at
+      least three digits, the phone number. A full phone number with area code is matched
+      exactly.
+    - `cursor` / `limit`: Pass `next_cursor` or `prev_cursor` back to move between pages;
+      every page costs the same as the first one.
+    """
+    return await service.get_clients(user, limit, term, cursor)
+
+
+@router.get(
+    "/clients/by-phone/{phone}",
+    summary="Get Clients by Phone",
+    response_model=List[ClientOutput],
+)
+async def get_clients_by_phone(user: DepUserPayload, service: ClientService, phone: str):
+    """
+    Exact lookup by phone number in any common format (with or without +55, spaces, dashes or
+    parentheses). The area code is required.
+    """
+    return await service.get_clients_by_phone(user, phone)
+
+
+@router.get(
+    "/clients/{client_id}",
+    summary="Get Client",
+    response_model=ClientOutput,
+)
+async def get_client(user: DepUserPayload, service: ClientService, client_id: int):
+    return await service.get_client(user, client_id)
+
+
+@router.get(
+    "/clients/{client_id}/transactions",
+    summary="Get Client Transactions",
+    response_model=TransactionCursorPage,
+)
+async def get_client_transactions(
+    user: DepUserPayload,
+    service: ClientService,
+    client_id: int,
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned by a previous page"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Active transactions of the client, newest first, with brand names. Pass `next_cursor` or
+    `prev_cursor` back to move between pages.
+    """
+    return await service.get_client_transactions(user, client_id, limit, cursor)
+
+
+@router.patch(
+    "/clients/{client_id}",
+    summary="Update Client",
+    response_model=ClientOutput,
+)
+async def update_client(
+    user: DepUserPayload, service: ClientService, client_id: int, data: ClientUpdateInput
+):
+    return await service.update_client(user, client_id, data)
@@ -1,7 +1,8 @@
 from datetime import date, datetime
-from typing import Optional
+from typing import Annotated, List, Optional, Union
 
-from fastapi import APIRouter, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
 from fastapi_pagination import LimitOffsetPage, Page, add_pagination
 from fastapi_pagination.ext.sqlalchemy import paginate
 from sqlalchemy import select
@@ -11,13 +12,27 @@ from server.configuration.database import DepDatabaseSession
 from server.model.role import UserRole
 from server.model.user import User
 from server.schema.transaction_schema import (
+    CountMode,
+    ExportFormat,
+    ImportFormat,
+    TransactionBatchInput,
+    TransactionBatchOutput,
+    TransactionBulkResult,
     TransactionCreateInput,
+    TransactionCursorPage,
+    TransactionFilters,
     TransactionOutput,
+    TransactionSlicePage,
+    TransactionStatusInput,
+    TransactionStatusOutput,
     TransactionUpdateInput,
     UserOut,
 )
-from server.service.client_bottle_transaction_service import TransactionService
-from server.utils.dependencies import DepUserPayload
+from server.service.client_bottle_transaction_service import (
+    TransactionService,
+    _TransactionService,
+)
+from server.utils.dependencies import DepUserAdminPayload, DepUserPayload
 from server.utils.reports import generate_pdf, upload_pdf_to_s3
 
 router = APIRouter(tags=["Client Bottle Transaction"])
@@ -25,30 +40,101 @@ report_router = APIRouter(tags=["Client Bottle Transaction Report"])
 router_test = APIRouter(tags=["Test - Pagination and AsyncSession"])
 
 
+def get_transaction_filters(
+    term: Optional[str] = Query(None, description="Search term"),
+    date_filter: Optional[date] = Query(
+        None, description="Filter by transaction date (yyyy-mm-dd)"
+    ),
+    date_from: Optional[date] = Query(None, description="Transactions on or after (yyyy-mm-dd)"),
+    date_to: Optional[date] = Query(None, description="Transactions on or before (yyyy-mm-dd)"),
+    brand_id: Optional[List[int]] = Query(None, description="Filter by one or more brand ids"),
+    client_id: Optional[int] = Query(None, description="Filter by client id"),
+) -> TransactionFilters:
+    return TransactionFilters(
+        term=term,
+        date_filter=date_filter,
+        date_from=date_from,
+        date_to=date_to,
+        client_id=client_id,
+        brand_ids=brand_id,
+    )
+
+
+DepTransactionFilters = Annotated[TransactionFilters, Depends(get_transaction_filters)]
+
+
 @router.get(
     "/transaction/",
     summary="Get all active transactions with filters - paginated",
-    response_model=Page[TransactionOutput],
+    response_model=Union[Page[TransactionOutput], TransactionCursorPage, TransactionSlicePage],
 )
 async def get_transactions(
     service: TransactionService,
     user: DepUserPayload,
-    page: int = Query(1),
-    size: int = Query(50),
-    term: Optional[str] = Query(None, description="Search term"),
-    date_filter: Optional[date] = Query(
-        None, description="Filter by transaction date (yyyy-mm-dd)"
-    ),
+    filters: DepTransactionFilters,
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned by a previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size in cursor mode"),
+    count: CountMode = Query(CountMode.EXACT, description="How the total is computed"),
 ):
     """
     Retrieve all active transactions with pagination.
 
     - `page`: The page number to retrieve.
     - `size`: The number of records per page.
-    - `term`: Optional search term to filter transactions by client name, phone, or recorded_by.
+    - `term`: Optional search term matched against the client name, last name, phone,
+      recorded_by or brand name. Results are ranked by relevance.
     - `date_filter`: Optional date filter to retrieve transactions by a specific date (yyyy-mm-dd).
+    - `date_from` / `date_to`: Optional inclusive date range (yyyy-mm-dd).
+    - `brand_id`: Optional, repeatable. Keeps transactions containing any of the given brands.
+    - `client_id`: Optional client id filter.
+
+    All filters can be combined.
+
+    - `count`: `exact` (default) runs a `COUNT(*)` for every page. `estimated` reuses a
+      count cached per filter combination for a short time. `none` skips the count and
+      answers with `has_next` instead of `total`/`pages`.
+    - `cursor` / `limit`: Opt-in cursor mode. When either is given, the response carries
+      `next_cursor` / `prev_cursor` instead of page counters and deep pages cost the same
+      as the first one. Pass the returned cursor back to move forwards or backwards.
+    """
+    return await service.get_paginated_transactions(page, size, filters, cursor, limit, count)
+
+
+@router.get(
+    "/transaction/export",
+    summary="Export all active transactions matching the filters as CSV or NDJSON",
+    response_class=StreamingResponse,
+)
+async def export_transactions(
+    user: DepUserPayload,
+    filters: DepTransactionFilters,
+    format: ExportFormat = Query(ExportFormat.CSV, description="Output format"),
+):
     """
-    return await service.get_paginated_transactions(page, size, term, date_filter)
+    Stream every active transaction matching the filters, one line per bottle item with the
+    brand name resolved. Accepts the same filters as `GET /transaction/`.
+
+    - `format`: `csv` (default, with a header line) or `ndjson` (one JSON object per line).
+
+    Rows are read from the database in batches and written as they arrive, so the export
+    size is not bounded by the API memory.
+    """
+    media_type = "text/csv" if format == ExportFormat.CSV else "application/x-ndjson"
+    return StreamingResponse(
+        _TransactionService.export_transactions(filters, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format.value}"'},
+    )
+
+
+@router.get(
+    "/transaction/cache/",
+    summary="Transaction list cache statistics - for administrators only.",
+)
+async def get_transaction_cache_stats(service: TransactionService, user: DepUserAdminPayload):
+    return service.get_cache_stats()
 
 
 @router.post(
@@ -68,6 +154,125 @@ async def post_transaction(
     return await service.post_transaction(transaction_input, user)
 
 
+@router.post(
+    "/transaction/bulk",
+    summary="Import a batch of transactions from a JSON array or a CSV file",
+    response_model=TransactionBulkResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+                "text/csv": {"schema": {"type": "string"}},
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                    }
+                },
+            },
+        }
+    },
+)
+async def bulk_create_transactions(
+    request: Request,
+    service: TransactionService,
+    user: DepUserPayload,
+):
+    """
+    Import many transactions at once, e.g. historical paper records of a new depot.
+
+    The body is either a JSON array of transactions (same fields as `POST /transaction/`
+    plus optional `transaction_date` and `recorded_by`), a `text/csv` body or a
+    `multipart/form-data` upload in the `file` field. CSV files have one line per item with
+    the columns `transaction_ref`, `client_name`, `last_name`, `client_phone`,
+    `transaction_date`, `recorded_by`, `brand_id`, `brand_name` and `quantity`; lines sharing
+    a `transaction_ref` form one transaction.
+
+    Clients and brands are resolved or created as in `POST /transaction/`. Invalid rows are
+    listed in `errors` (by array position or CSV line) without aborting the rest of the batch.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if not isinstance(upload, UploadFile):
+            raise HTTPException(status_code=400, detail="Envie o arquivo no campo 'file'.")
+        payload = await upload.read()
+        is_csv = (upload.filename or "").lower().endswith(".csv") or (
+            upload.content_type == "text/csv"
+        )
+    else:
+        payload = await request.body()
+        is_csv = content_type.startswith("text/csv")
+    payload_format = ImportFormat.CSV if is_csv else ImportFormat.JSON
+    return await service.bulk_create_transactions(payload, payload_format, user)
+
+
+@router.post(
+    "/transaction/batch",
+    summary="Run an ordered batch of transaction operations in one database transaction",
+    response_model=TransactionBatchOutput,
+)
+async def run_transaction_batch(
+    batch: TransactionBatchInput,
+    service: TransactionService,
+    user: DepUserPayload,
+):
+    """
+    Replay a queue of operations recorded offline with a single request.
+
+    Each operation has an `op`:
+    - `create`: `data` as in `POST /transaction/`, optional `ref` to target it later in the batch.
+    - `update`: `data` as in `PUT /transaction/{transaction_id}`.
+    - `deactivate` / `activate`.
+
+    `update`, `deactivate` and `activate` take either `transaction_id` or the `ref` of a
+    `create` from the same batch. Operations run in order and the response carries one result
+    per operation. A failed operation is undone on its own and the rest are committed, unless
+    `atomic` is set, in which case any failure rolls the whole batch back.
+    """
+    return await service.run_batch(batch, user)
+
+
+@router.patch(
+    "/transaction/deactivate",
+    summary="Deactivate transactions by ids or filter",
+    response_model=TransactionStatusOutput,
+)
+async def deactivate_transactions(
+    target: TransactionStatusInput,
+    service: TransactionService,
+    user: DepUserPayload,
+):
+    """
+    Deactivate every active transaction matching `ids` and/or the `client_id`,
+    `date_from` / `date_to` and `brand_ids` filters, e.g. when closing a month.
+    At least one of them is required; without `ids`, only administrators may call it.
+    Returns the number and ids of the transactions changed.
+    """
+    return await service.set_transactions_active(target, False, user)
+
+
+@router.patch(
+    "/transaction/activate",
+    summary="Activate transactions by ids or filter",
+    response_model=TransactionStatusOutput,
+)
+async def activate_transactions(
+    target: TransactionStatusInput,
+    service: TransactionService,
+    user: DepUserPayload,
+):
+    """
+    Reactivate every inactive transaction matching `ids` and/or the `client_id`,
+    `date_from` / `date_to` and `brand_ids` filters. At least one of them is required;
+    without `ids`, only administrators may call it. Returns the number and ids of the
+    transactions changed.
+    """
+    return await service.set_transactions_active(target, True, user)
+
+
 @router.put(
     "/transaction/{transaction_id}",
     summary="Update an existing client bottle transaction",
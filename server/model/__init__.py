@@ -1,7 +1,10 @@
 from .bottle import *
 from .bottle_brand import *
+from .bottle_brand_stock import *
 from .client import *
 from .client_bottle_transaction import *
+from .client_bottle_transaction_item import *
+from .client_brand_balance import *
 from .invite import *
 from .meta import *
 from .user import *
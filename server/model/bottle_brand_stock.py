@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, ForeignKey, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from server.model.meta import Base
+
+
+class BottleBrandStock(Base):
+    """
+    Striped counters of bottles lent and returned per brand, maintained by triggers on
+    `client_bottle_transaction_item`. A brand's totals are the sum of its stripes.
+    """
+
+    __tablename__ = "bottle_brand_stock"
+
+    id_bottle_brand: Mapped[int] = mapped_column(
+        ForeignKey("bottle_brand.id_bottle_brand", ondelete="CASCADE"), primary_key=True
+    )
+    stripe: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    lent: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    returned: Mapped[int] = mapped_column(BigInteger, server_default="0")
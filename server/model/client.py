@@ -16,3 +16,7 @@ class Client(Base, BaseEntity):
     name: Mapped[str] = mapped_column(String)
     last_name: Mapped[str] = mapped_column(String)
     phone: Mapped[Optional[str]] = mapped_column(String)
+    # normalize_phone_br(phone): E.164, or NULL when the phone is not a full Brazilian number.
+    phone_normalized: Mapped[Optional[str]] = mapped_column(String, index=True)
+    # client_identity_key(name, last_name), kept unique so concurrent writers share one row.
+    identity_key: Mapped[Optional[str]] = mapped_column(String, unique=True)
@@ -13,8 +13,25 @@ from server.model.meta import Base, BaseEntity
 class ClientBottleTransaction(Base, BaseEntity):
     __tablename__ = "client_bottle_transaction"
     __table_args__ = (
-        Index("idx_transaction_data_json", "transaction_data_json", postgresql_using="gin"),
+        Index(
+            "idx_transaction_data_json",
+            "transaction_data_json",
+            postgresql_using="gin",
+            postgresql_ops={"transaction_data_json": "jsonb_path_ops"},
+        ),
         Index("idx_transaction_date", "transaction_date"),
+        Index(
+            "idx_transaction_date_id",
+            "transaction_date",
+            "id_client_bottle_transaction",
+            postgresql_where=text("fl_active"),
+        ),
+        Index(
+            "idx_transaction_client_date_id",
+            "id_client",
+            text("transaction_date DESC"),
+            text("id_client_bottle_transaction DESC"),
+        ),
     )
 
     id_client_bottle_transaction: Mapped[int] = mapped_column(Integer, primary_key=True)
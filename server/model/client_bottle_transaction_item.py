@@ -0,0 +1,35 @@
+from datetime import date
+
+from sqlalchemy import Date, ForeignKey, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from server.model.meta import Base, BaseEntity
+
+
+class ClientBottleTransactionItem(Base, BaseEntity):
+    """
+    One row per item of `ClientBottleTransaction.transaction_data_json`, written together with
+    the transaction so aggregations can group on indexed columns instead of unpacking JSONB.
+    """
+
+    __tablename__ = "client_bottle_transaction_item"
+    __table_args__ = (
+        Index("idx_transaction_item_date_brand", "transaction_date", "id_bottle_brand"),
+        Index("idx_transaction_item_client_brand", "id_client", "id_bottle_brand"),
+    )
+
+    id_client_bottle_transaction_item: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id_client_bottle_transaction: Mapped[int] = mapped_column(
+        ForeignKey(
+            "client_bottle_transaction.id_client_bottle_transaction",
+            name="fk_client_bottle_transaction_item_transaction",
+            ondelete="CASCADE",
+        ),
+        index=True,
+    )
+    id_client: Mapped[int] = mapped_column(ForeignKey("client.id_client"))
+    id_bottle_brand: Mapped[int] = mapped_column(
+        ForeignKey("bottle_brand.id_bottle_brand"), index=True
+    )
+    quantity: Mapped[int] = mapped_column(Integer)
+    transaction_date: Mapped[date] = mapped_column(Date)
@@ -0,0 +1,42 @@
+import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from server.model.meta import CURRENT_TIMESTAMP_BRAZIL, Base
+
+
+class ClientBrandBalance(Base):
+    """
+    Bottles of each brand a client still holds: the quantity of their active transaction items.
+    Maintained by triggers on `client_bottle_transaction_item`, so it is never written by the
+    application; `BalanceRepository.rebuild_balances` (run by `script.rebuild_client_balances`)
+    recomputes it from the items.
+    """
+
+    __tablename__ = "client_brand_balance"
+    __table_args__ = (
+        Index(
+            "idx_client_brand_balance_brand_quantity",
+            "id_bottle_brand",
+            text("quantity DESC"),
+            text("id_client DESC"),
+        ),
+        Index(
+            "idx_client_brand_balance_quantity",
+            text("quantity DESC"),
+            text("id_client DESC"),
+            text("id_bottle_brand DESC"),
+        ),
+    )
+
+    id_client: Mapped[int] = mapped_column(
+        ForeignKey("client.id_client", ondelete="CASCADE"), primary_key=True
+    )
+    id_bottle_brand: Mapped[int] = mapped_column(
+        ForeignKey("bottle_brand.id_bottle_brand", ondelete="CASCADE"), primary_key=True
+    )
+    quantity: Mapped[int] = mapped_column(Integer, server_default="0")
+    last_movement_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=CURRENT_TIMESTAMP_BRAZIL
+    )
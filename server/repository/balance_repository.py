@@ -0,0 +1,186 @@
+import logging
+from typing import Annotated, List, Optional, Tuple
+
+from fastapi import Depends
+from sqlalchemy import literal, select, text, tuple_
+
+from server.configuration.database import DepDatabaseSession
+from server.model.bottle_brand import BottleBrand
+from server.model.client import Client
+from server.model.client_brand_balance import ClientBrandBalance
+from server.schema.balance_schema import (
+    BalanceCursor,
+    BalanceCursorPage,
+    BalanceOutput,
+    BrandBalanceOutput,
+)
+from server.utils.pagination import encode_cursor
+
+# What `client_brand_balance` must hold, recomputed from the items.
+EXPECTED_BALANCES_CTE = """
+    WITH expected AS (
+        SELECT id_client,
+            id_bottle_brand,
+            sum(quantity) FILTER (WHERE fl_active) AS quantity,
+            max(coalesce(updated_at, created_at)) AS last_movement_at
+        FROM client_bottle_transaction_item
+        GROUP BY id_client, id_bottle_brand
+        HAVING sum(quantity) FILTER (WHERE fl_active) <> 0
+    )
+"""
+
+
+class _BalanceRepository:
+    def __init__(self, db: DepDatabaseSession):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+
+    async def get_client_balance(self, client_id: int) -> List[BrandBalanceOutput]:
+        """
+        Brands the client still holds bottles of, largest balance first. Reads the client's
+        rows through the primary key.
+        """
+        result = await self.db.execute(
+            select(ClientBrandBalance, BottleBrand.name)
+            .join(BottleBrand, BottleBrand.id_bottle_brand == ClientBrandBalance.id_bottle_brand)
+            .where(ClientBrandBalance.id_client == client_id, ClientBrandBalance.quantity != 0)
+            .order_by(ClientBrandBalance.quantity.desc(), ClientBrandBalance.id_bottle_brand)
+        )
+        return [
+            BrandBalanceOutput(
+                id_bottle_brand=balance.id_bottle_brand,
+                brand_name=brand_name,
+                quantity=balance.quantity,
+                last_movement_at=balance.last_movement_at,
+            )
+            for balance, brand_name in result.all()
+        ]
+
+    async def get_balances(
+        self,
+        limit: int,
+        min_quantity: int,
+        brand_id: Optional[int] = None,
+        cursor: Optional[BalanceCursor] = None,
+    ) -> BalanceCursorPage:
+        """
+        Client balances of at least `min_quantity` bottles, largest first. Seeks on
+        `idx_client_brand_balance_brand_quantity` when filtering by brand and on
+        `idx_client_brand_balance_quantity` otherwise, so every page costs the same.
+        """
+        query = (
+            select(ClientBrandBalance, BottleBrand.name, Client.name, Client.last_name)
+            .join(BottleBrand, BottleBrand.id_bottle_brand == ClientBrandBalance.id_bottle_brand)
+            .join(Client, Client.id_client == ClientBrandBalance.id_client)
+            .where(ClientBrandBalance.quantity >= min_quantity)
+        )
+        if brand_id is not None:
+            query = query.where(ClientBrandBalance.id_bottle_brand == brand_id)
+            key = [ClientBrandBalance.quantity, ClientBrandBalance.id_client]
+            position = [cursor.quantity, cursor.id_client] if cursor else []
+        else:
+            key = [
+                ClientBrandBalance.quantity,
+                ClientBrandBalance.id_client,
+                ClientBrandBalance.id_bottle_brand,
+            ]
+            position = (
+                [cursor.quantity, cursor.id_client, cursor.id_bottle_brand] if cursor else []
+            )
+        if cursor is not None:
+            query = query.where(tuple_(*key) < tuple_(*(literal(value) for value in position)))
+        query = query.order_by(*(column.desc() for column in key))
+
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.all()
+        has_next = len(rows) > limit
+        items = [
+            BalanceOutput(
+                id_client=balance.id_client,
+                client_name=client_name,
+                client_last_name=client_last_name,
+                id_bottle_brand=balance.id_bottle_brand,
+                brand_name=brand_name,
+                quantity=balance.quantity,
+                last_movement_at=balance.last_movement_at,
+            )
+            for balance, brand_name, client_name, client_last_name in rows[:limit]
+        ]
+        last = items[-1] if items else None
+        return BalanceCursorPage(
+            items=items,
+            limit=limit,
+            next_cursor=(
+                encode_cursor(
+                    BalanceCursor(
+                        quantity=last.quantity,
+                        id_client=last.id_client,
+                        id_bottle_brand=last.id_bottle_brand,
+                    )
+                )
+                if last and has_next
+                else None
+            ),
+        )
+
+    async def rebuild_balances(self, dry_run: bool = False) -> Tuple[int, int]:
+        """
+        Recomputes every balance from the items and fixes the rows that differ, leaving the
+        correct ones (and their `last_movement_at`) untouched. Item writers wait on a share
+        lock until the caller commits, readers do not. Returns the rows corrected and removed.
+        """
+        await self.db.execute(text("LOCK TABLE client_bottle_transaction_item IN SHARE MODE"))
+        if dry_run:
+            result = await self.db.execute(
+                text(
+                    f"""
+                    {EXPECTED_BALANCES_CTE}
+                    SELECT count(*) FILTER (WHERE e.quantity IS NOT NULL),
+                        count(*) FILTER (WHERE e.quantity IS NULL AND b.quantity <> 0)
+                    FROM expected e
+                        FULL JOIN client_brand_balance b USING (id_client, id_bottle_brand)
+                    WHERE e.quantity IS DISTINCT FROM b.quantity
+                    """
+                )
+            )
+            corrected, removed = result.one()
+            return corrected, removed
+
+        # Zero balances left behind by the triggers are dropped too, but are not counted.
+        removed = await self.db.scalar(
+            text(
+                f"""
+                {EXPECTED_BALANCES_CTE}, deleted AS (
+                    DELETE FROM client_brand_balance b
+                    WHERE NOT EXISTS (
+                        SELECT 1
+                        FROM expected e
+                        WHERE e.id_client = b.id_client AND e.id_bottle_brand = b.id_bottle_brand
+                    )
+                    RETURNING b.quantity
+                )
+                SELECT count(*) FILTER (WHERE quantity <> 0) FROM deleted
+                """
+            )
+        )
+        corrected = await self.db.execute(
+            text(
+                f"""
+                {EXPECTED_BALANCES_CTE}
+                INSERT INTO client_brand_balance AS b (
+                    id_client, id_bottle_brand, quantity, last_movement_at
+                )
+                SELECT id_client, id_bottle_brand, quantity, last_movement_at
+                FROM expected
+                ORDER BY id_client, id_bottle_brand
+                ON CONFLICT (id_client, id_bottle_brand) DO UPDATE
+                SET quantity = excluded.quantity,
+                    last_movement_at = excluded.last_movement_at
+                WHERE b.quantity <> excluded.quantity
+                """
+            )
+        )
+        return corrected.rowcount, removed
+
+
+BalanceRepository = Annotated[_BalanceRepository, Depends(_BalanceRepository)]
@@ -1,14 +1,96 @@
+import asyncio
+import json
 import logging
-from typing import Annotated, List, Optional
+import re
+import time
+from typing import Annotated, Dict, Iterable, List, Optional, Tuple, Union
 
 from fastapi import Depends
-from sqlalchemy import delete, select, text
+from sqlalchemy import (
+    Row,
+    bindparam,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    union,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.types import Integer, String
 
 from server.configuration.database import DepDatabaseSession
+from server.configuration.environment import SETTINGS
 from server.model.bottle_brand import BottleBrand
-from server.schema.bottle_brand_schema import BottleBrandUpdate
+from server.model.bottle_brand_stock import BottleBrandStock
+from server.model.client_bottle_transaction_item import ClientBottleTransactionItem
+from server.schema.bottle_brand_schema import BottleBrandOutput, BottleBrandUpdate
+from server.utils.cache import TTLCache
 from server.utils.types import SessionPayload
-from server.utils.utils import get_first_record_as_dict
+
+BRAND_RENAME_BATCH_SIZE = 1000
+# How long a rename waits for the transaction writes that were running when it committed.
+BRAND_RENAME_WAIT_SECONDS = 30
+
+# Brands whose summed stock stripes differ from the totals recomputed from the items. A
+# single statement sees the items and the counters as of the same snapshot.
+BOTTLE_BRAND_STOCK_DIFF_QUERY = text(
+    """
+    WITH expected AS (
+        SELECT id_bottle_brand,
+            sum(quantity) AS lent,
+            coalesce(sum(quantity) FILTER (WHERE NOT fl_active), 0) AS returned
+        FROM client_bottle_transaction_item
+        GROUP BY id_bottle_brand
+    ), counted AS (
+        SELECT id_bottle_brand, sum(lent) AS lent, sum(returned) AS returned
+        FROM bottle_brand_stock
+        GROUP BY id_bottle_brand
+    )
+    SELECT bb.id_bottle_brand,
+        bb.name,
+        coalesce(c.lent, 0) AS lent,
+        coalesce(c.returned, 0) AS returned,
+        coalesce(e.lent, 0) AS expected_lent,
+        coalesce(e.returned, 0) AS expected_returned
+    FROM bottle_brand bb
+        LEFT JOIN expected e ON e.id_bottle_brand = bb.id_bottle_brand
+        LEFT JOIN counted c ON c.id_bottle_brand = bb.id_bottle_brand
+    WHERE coalesce(c.lent, 0) <> coalesce(e.lent, 0)
+        OR coalesce(c.returned, 0) <> coalesce(e.returned, 0)
+    ORDER BY bb.id_bottle_brand
+    """
+)
+
+# Brands resolved by the transaction write path, keyed by ("id", id) and by ("name", name) with
+# the name exactly as given: `normalize_product_name` cannot be reproduced in Python, and a
+# looser key could merge names the unique index keeps apart. Only committed brands are stored.
+# Each worker holds its own copy, so changes made by another worker are picked up after
+# `bottle_brand_cache_ttl` seconds at most.
+bottle_brand_cache: TTLCache[Tuple[str, Union[int, str]], BottleBrandOutput] = TTLCache(
+    maxsize=SETTINGS.bottle_brand_cache_size, ttl=SETTINGS.bottle_brand_cache_ttl
+)
+
+
+def bottle_brand_cache_key(
+    name: Optional[str] = None, id_bottle_brand: Optional[int] = None
+) -> Tuple[str, Union[int, str]]:
+    if id_bottle_brand:
+        return "id", id_bottle_brand
+    return "name", name or ""
+
+
+def cache_bottle_brand(brand: BottleBrandOutput, requested_name: Optional[str] = None):
+    """
+    Stores `brand` under its id, its own name and the name it was looked up by, if any.
+    """
+    bottle_brand_cache.set(bottle_brand_cache_key(id_bottle_brand=brand.id_bottle_brand), brand)
+    for name in filter(None, (brand.name, requested_name)):
+        bottle_brand_cache.set(bottle_brand_cache_key(name=name), brand)
 
 
 class _BottleBrandRepository:
@@ -17,36 +99,124 @@ class _BottleBrandRepository:
         self.logger = logging.getLogger(__name__)
 
     async def create_bottle_brand(self, creation_user_id: int, name: str) -> BottleBrand:
-        new_brand = BottleBrand(creation_user_id=creation_user_id, name=name)
-        self.db.add(new_brand)
+        new_brand = await self.insert_bottle_brand(creation_user_id, name)
         await self.db.commit()
-        await self.db.refresh(new_brand)
         return new_brand
 
+    async def insert_bottle_brand(self, creation_user_id: int, name: str) -> BottleBrand:
+        return await self.db.scalar(
+            insert(BottleBrand)
+            .values(creation_user_id=creation_user_id, name=name)
+            .returning(BottleBrand)
+        )
+
     async def get_all_bottle_brands(self) -> List[BottleBrand]:
-        result = await self.db.execute(select(BottleBrand))
+        result = await self.db.execute(select(BottleBrand).order_by(BottleBrand.id_bottle_brand))
         return result.scalars().all()
 
     async def get_bottle_brand(
         self, name: Optional[str] = None, id_bottle_brand: Optional[int] = None
     ) -> Optional[BottleBrand]:
-        name_pattern = f"%{name}%" if name else None
+        """
+        Exact lookup, by primary key when `id_bottle_brand` is given, otherwise by normalized
+        name through `uq_bottle_brand_normalized_name`.
+        """
+        if id_bottle_brand:
+            condition = BottleBrand.id_bottle_brand == id_bottle_brand
+        elif name:
+            normalized_name = func.normalize_product_name(BottleBrand.name)
+            condition = normalized_name == func.normalize_product_name(name)
+        else:
+            return None
+        return await self.db.scalar(select(BottleBrand).where(condition))
+
+    async def search_bottle_brands(self, name: str, limit: int = 20) -> List[BottleBrand]:
+        """
+        Fuzzy mode: brands whose normalized name contains `name`, shortest names first. Only
+        for explicit searches; writes must resolve brands with `get_bottle_brand`.
+        """
+        pattern = literal("%") + func.normalize_product_name(name) + literal("%")
+        query = (
+            select(BottleBrand)
+            .where(func.normalize_product_name(BottleBrand.name).like(pattern))
+            .order_by(func.length(BottleBrand.name), BottleBrand.id_bottle_brand)
+            .limit(limit)
+        )
+        return (await self.db.scalars(query)).all()
+
+    async def suggest_bottle_brands(
+        self, term: str, limit: int, min_similarity: float
+    ) -> List[Row[Tuple[BottleBrand, float, bool]]]:
+        """
+        Typeahead ranking: names starting with `term` first, then by trigram similarity. The
+        candidates are the `limit` nearest prefix matches and the `limit` nearest brands overall,
+        both read from `idx_bottle_brand_name_trgm`, so the cost does not grow with the catalogue.
+        """
+        normalized_name = func.normalize_product_name(BottleBrand.name)
+        normalized_term = func.normalize_product_name(term)
+        pattern = func.normalize_product_name(re.sub(r"([\\%_])", r"\\\1", term)) + literal("%")
+        is_prefix = normalized_name.like(pattern, escape="\\")
+        distance = normalized_name.op("<->")(normalized_term)
+        score = func.similarity(normalized_name, normalized_term)
+
+        candidates = union(
+            select(BottleBrand.id_bottle_brand).where(is_prefix).order_by(distance).limit(limit),
+            select(BottleBrand.id_bottle_brand).order_by(distance).limit(limit),
+        ).subquery()
+        query = (
+            select(BottleBrand, score.label("score"), is_prefix.label("is_prefix"))
+            .where(BottleBrand.id_bottle_brand.in_(select(candidates.c.id_bottle_brand)))
+            .where(or_(is_prefix, score >= min_similarity))
+            .order_by(is_prefix.desc(), score.desc(), BottleBrand.name)
+            .limit(limit)
+        )
+        return (await self.db.execute(query)).all()
+
+    async def get_or_insert_bottle_brand(self, creation_user_id: int, name: str) -> BottleBrand:
+        """
+        Inserts the brand unless one with the same normalized name exists, in which case that
+        one is returned. Safe against concurrent writers; committing is left to the caller.
+        """
+        query = pg_insert(BottleBrand).values(creation_user_id=creation_user_id, name=name)
+        query = query.on_conflict_do_update(
+            index_elements=[func.normalize_product_name(BottleBrand.name)],
+            set_={"name": BottleBrand.name},
+        ).returning(BottleBrand)
+        return await self.db.scalar(query, execution_options={"populate_existing": True})
+
+    async def get_bottle_brands(
+        self, ids: Iterable[int] = (), names: Iterable[str] = ()
+    ) -> Tuple[Dict[int, BottleBrand], Dict[str, BottleBrand]]:
+        """
+        Loads the brands with the given ids and the brands whose normalized name equals one of
+        `names` in a single query. Returns them by id and by requested name.
+        """
         query = text(
             """
-            SELECT *
-            FROM bottle_brand
-            WHERE public.unaccent(LOWER(name)) ILIKE public.unaccent(LOWER(:name))
-            OR id_bottle_brand = :id_bottle_brand
+            SELECT NULL AS requested_name, bb.*
+            FROM bottle_brand bb
+            WHERE bb.id_bottle_brand = ANY(:ids)
+            UNION ALL
+            SELECT requested.name, bb.*
+            FROM unnest(:names) AS requested(name)
+                JOIN bottle_brand bb
+                    ON normalize_product_name(bb.name) = normalize_product_name(requested.name)
             """
+        ).bindparams(
+            bindparam("ids", type_=ARRAY(Integer)), bindparam("names", type_=ARRAY(String))
         )
-        result = await self.db.execute(
-            query, {"name": name_pattern, "id_bottle_brand": id_bottle_brand}
-        )
-        brand_dict = await get_first_record_as_dict(result)
-
-        if brand_dict and brand_dict != {}:
-            return BottleBrand(**brand_dict)
-        return None
+        result = await self.db.execute(query, {"ids": list(ids), "names": list(names)})
+        by_id: Dict[int, BottleBrand] = {}
+        by_name: Dict[str, BottleBrand] = {}
+        for row in result.mappings():
+            brand_dict = dict(row)
+            requested_name = brand_dict.pop("requested_name")
+            brand = BottleBrand(**brand_dict)
+            if requested_name is None:
+                by_id[brand.id_bottle_brand] = brand
+            else:
+                by_name.setdefault(requested_name, brand)
+        return by_id, by_name
 
     async def update_bottle_brand(
         self, bottle_brand: BottleBrand, update_user_id: int, new_name: str
@@ -68,16 +238,178 @@ class _BottleBrandRepository:
             },
         )
         await self.db.commit()
+        if new_name:
+            await self.propagate_bottle_brand_name(bottle_brand.id_bottle_brand)
         result = await self.db.execute(
             select(BottleBrand).where(BottleBrand.id_bottle_brand == bottle_brand.id_bottle_brand)
         )
         return result.scalars().one_or_none()
 
+    async def propagate_bottle_brand_name(self, id_bottle_brand: int) -> int:
+        """
+        Rewrites the `brand_name` stored in the transactions of the brand after a rename. The
+        primary key is walked in chunks of `BRAND_RENAME_BATCH_SIZE`, each committed on its own
+        so a popular brand does not lock the whole table. Writes still running when the rename
+        committed may have stored the old name after the walk passed them, so once they are
+        over a final pass repairs them. Returns the number of rewritten transactions.
+        """
+        writers = await self._get_running_transaction_writers()
+        updated = await self._rewrite_bottle_brand_name(id_bottle_brand)
+        await self._wait_for_transaction_writers(writers)
+        updated += await self._rewrite_bottle_brand_name(id_bottle_brand)
+        self.logger.info(f"Brand {id_bottle_brand} renamed in {updated} transactions")
+        return updated
+
+    async def _rewrite_bottle_brand_name(self, id_bottle_brand: int) -> int:
+        # Only rows holding another name for the brand are touched, and
+        # `trg_client_bottle_transaction_brand_names` writes the current one into them.
+        query = text(
+            """
+            WITH batch AS (
+                SELECT id_client_bottle_transaction
+                FROM client_bottle_transaction
+                WHERE id_client_bottle_transaction > :last_id
+                AND transaction_data_json @> CAST(:brand AS jsonb)
+                ORDER BY id_client_bottle_transaction
+                LIMIT :batch_size
+            ), renamed AS (
+                UPDATE client_bottle_transaction cbt
+                SET transaction_data_json = cbt.transaction_data_json
+                FROM batch, bottle_brand bb
+                WHERE cbt.id_client_bottle_transaction = batch.id_client_bottle_transaction
+                AND bb.id_bottle_brand = :id_bottle_brand
+                AND EXISTS (
+                    SELECT 1
+                    FROM jsonb_array_elements(cbt.transaction_data_json) AS items(item)
+                    WHERE (items.item ->> 'brand_id')::int = :id_bottle_brand
+                    AND items.item ->> 'brand_name' IS DISTINCT FROM bb.name
+                )
+                RETURNING 1
+            )
+            SELECT max(id_client_bottle_transaction) AS last_id,
+                (SELECT count(*) FROM renamed) AS renamed
+            FROM batch
+            """
+        )
+        params = {
+            "brand": json.dumps([{"brand_id": id_bottle_brand}]),
+            "id_bottle_brand": id_bottle_brand,
+            "batch_size": BRAND_RENAME_BATCH_SIZE,
+            "last_id": 0,
+        }
+        updated = 0
+        while params["last_id"] is not None:
+            row = (await self.db.execute(query, params)).one()
+            await self.db.commit()
+            params["last_id"] = row.last_id
+            updated += row.renamed
+        return updated
+
+    async def _get_running_transaction_writers(self) -> List[str]:
+        """
+        Virtual transaction ids of the other sessions currently writing
+        `client_bottle_transaction`.
+        """
+        result = await self.db.scalars(
+            text(
+                """
+                SELECT DISTINCT virtualtransaction
+                FROM pg_locks
+                WHERE relation = CAST('client_bottle_transaction' AS regclass)
+                AND mode = 'RowExclusiveLock'
+                AND pid <> pg_backend_pid()
+                """
+            )
+        )
+        writers = result.all()
+        await self.db.commit()
+        return writers
+
+    async def _wait_for_transaction_writers(self, writers: List[str]):
+        query = text(
+            """
+            SELECT count(*)
+            FROM pg_locks
+            WHERE relation = CAST('client_bottle_transaction' AS regclass)
+            AND mode = 'RowExclusiveLock'
+            AND virtualtransaction = ANY(:writers)
+            """
+        ).bindparams(bindparam("writers", type_=ARRAY(String)))
+        deadline = time.monotonic() + BRAND_RENAME_WAIT_SECONDS
+        while writers:
+            running = await self.db.scalar(query, {"writers": writers})
+            await self.db.commit()
+            if not running:
+                return
+            if time.monotonic() > deadline:
+                self.logger.warning(
+                    f"{running} transaction writes still running after "
+                    f"{BRAND_RENAME_WAIT_SECONDS}s; repairing brand names without them"
+                )
+                return
+            await asyncio.sleep(0.05)
+
+    async def is_bottle_brand_in_use(self, id_bottle_brand: int) -> bool:
+        query = select(
+            exists().where(ClientBottleTransactionItem.id_bottle_brand == id_bottle_brand)
+        )
+        return bool(await self.db.scalar(query))
+
     async def delete_bottle_brand(self, id_bottle_brand: int):
         await self.db.execute(
             delete(BottleBrand).where(BottleBrand.id_bottle_brand == id_bottle_brand)
         )
         await self.db.commit()
 
+    async def get_bottle_brand_stock(self) -> List[Row]:
+        """
+        `(id_bottle_brand, name, lent, returned)` of every brand, summing its counter stripes.
+        """
+        result = await self.db.execute(
+            select(
+                BottleBrand.id_bottle_brand,
+                BottleBrand.name,
+                func.coalesce(func.sum(BottleBrandStock.lent), 0).label("lent"),
+                func.coalesce(func.sum(BottleBrandStock.returned), 0).label("returned"),
+            )
+            .outerjoin(
+                BottleBrandStock, BottleBrandStock.id_bottle_brand == BottleBrand.id_bottle_brand
+            )
+            .group_by(BottleBrand.id_bottle_brand)
+            .order_by(BottleBrand.id_bottle_brand)
+        )
+        return result.all()
+
+    async def check_bottle_brand_stock(self, fix: bool = False) -> List[Row]:
+        """
+        Recomputes the stock of every brand from the items and returns the brands whose
+        counters differ. With `fix`, their stripes are replaced by a single row holding the
+        recomputed totals; item writers wait on a share lock until the caller commits.
+        """
+        if fix:
+            await self.db.execute(text("LOCK TABLE client_bottle_transaction_item IN SHARE MODE"))
+        result = await self.db.execute(BOTTLE_BRAND_STOCK_DIFF_QUERY)
+        rows = result.all()
+        if not fix or not rows:
+            return rows
+
+        brand_ids = [row.id_bottle_brand for row in rows]
+        await self.db.execute(
+            delete(BottleBrandStock).where(BottleBrandStock.id_bottle_brand.in_(brand_ids))
+        )
+        await self.db.execute(
+            insert(BottleBrandStock),
+            [
+                {
+                    "id_bottle_brand": row.id_bottle_brand,
+                    "stripe": 0,
+                    "lent": row.expected_lent,
+                    "returned": row.expected_returned,
+                }
+                for row in rows
+            ],
+        )
+        return rows
+
 
 BottleBrandRepository = Annotated[_BottleBrandRepository, Depends(_BottleBrandRepository)]
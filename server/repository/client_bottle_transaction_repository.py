@@ -1,24 +1,79 @@
 import logging
+import re
 from datetime import date
-from typing import Annotated, List, Optional
+from typing import Annotated, AsyncIterator, Dict, List, Optional, Tuple, Union
 
 from fastapi import Depends, HTTPException
-from fastapi_pagination import Page, add_pagination
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import String, func, or_, select, text
+from fastapi_pagination import Page, set_page
+from fastapi_pagination.ext.sqlalchemy import create_count_query, create_paginate_query, paginate
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    text,
+    tuple_,
+    union,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
 
 from server.configuration.database import DepDatabaseSession
+from server.configuration.environment import SETTINGS
 from server.model.bottle_brand import BottleBrand
 from server.model.client import Client
 from server.model.client_bottle_transaction import ClientBottleTransaction
-from server.repository.bottle_brand_repository import BottleBrandRepository, _BottleBrandRepository
+from server.model.client_bottle_transaction_item import ClientBottleTransactionItem
+from server.repository.bottle_brand_repository import (
+    BottleBrandRepository,
+    _BottleBrandRepository,
+    bottle_brand_cache,
+    bottle_brand_cache_key,
+    cache_bottle_brand,
+)
+from server.repository.client_repository import (
+    CLIENT_SEARCH_EXPRESSION,
+    PHONE_SEARCH_EXPRESSION,
+    ClientRepository,
+    _ClientRepository,
+    phone_term,
+)
+from server.schema.bottle_brand_schema import BottleBrandOutput
 from server.schema.transaction_schema import (
     BottleBrandInput,
+    CountMode,
+    CursorDirection,
+    TransactionBulkInput,
     TransactionCreateInput,
+    TransactionCursor,
+    TransactionCursorPage,
+    TransactionFilters,
     TransactionOutput,
+    TransactionSlicePage,
+    TransactionStatusInput,
 )
+from server.utils.cache import TTLCache
+from server.utils.pagination import UnboundedParams, encode_cursor
 from server.utils.types import SessionPayload
-from server.utils.utils import get_first_record_as_dict, process_transaction_data
+from server.utils.utils import (
+    get_first_record_as_dict,
+    process_transaction_data,
+    set_transaction_brand_names,
+)
+
+# Must match the trigram index expression, otherwise the planner cannot use it.
+RECORDED_BY_SEARCH_EXPRESSION = "normalize_product_name({table}.recorded_by)"
+
+transaction_count_cache: TTLCache[str, int] = TTLCache(
+    maxsize=1024, ttl=SETTINGS.transaction_count_cache_ttl
+)
 
 
 class _TransactionRepository:
@@ -26,8 +81,8 @@ class _TransactionRepository:
         self.db = db
         self.logger = logging.getLogger(__name__)
 
-    async def get_paginated_transactions(self, page: int, size: int) -> Page[TransactionOutput]:
-        query = (
+    def _select_transactions(self) -> Select:
+        return (
             select(
                 ClientBottleTransaction.id_client_bottle_transaction,
                 Client.name.label("client_name"),
@@ -39,140 +94,571 @@ class _TransactionRepository:
             )
             .join(Client, Client.id_client == ClientBottleTransaction.id_client)
             .where(ClientBottleTransaction.fl_active == True)
-            .order_by(ClientBottleTransaction.transaction_date.desc())
-            .limit(size)
-            .offset((page - 1) * size)
         )
-        transactions = await paginate(self.db, query, unique=False)
-        return await process_transaction_data(transactions, self.db)
 
-    async def get_paginated_transactions_by_term(
-        self, page: int, size: int, term: str
-    ) -> Page[TransactionOutput]:
-        term_pattern = f"%{term}%"
-        query = (
-            select(
-                ClientBottleTransaction.id_client_bottle_transaction,
-                Client.name.label("client_name"),
-                Client.last_name.label("client_last_name"),
-                Client.phone.label("client_phone"),
-                ClientBottleTransaction.transaction_data_json.label("transaction_data"),
-                ClientBottleTransaction.transaction_date,
-                ClientBottleTransaction.recorded_by,
+    async def _search_filter(self, term: str) -> Tuple[ColumnElement, ColumnElement]:
+        """
+        Builds the `term` filter out of index-driven branches (trigram indexes on the
+        normalized client name, phone digits and recorded_by, plus JSONB containment for
+        the brands whose name matches) and the relevance used to rank the matches.
+        """
+        normalized_term = func.normalize_product_name(term)
+        pattern = literal("%") + normalized_term + literal("%")
+
+        search_client = aliased(Client, name="search_client")
+        search_transaction = aliased(ClientBottleTransaction, name="search_transaction")
+
+        client_expression = literal_column(CLIENT_SEARCH_EXPRESSION.format(table="search_client"))
+        client_conditions = [
+            client_expression.like(pattern),
+            client_expression.op("%>")(normalized_term),
+        ]
+        phone_digits = re.sub(r"\D", "", term)
+        phone = phone_term(term)
+        if phone:
+            # A full phone number is matched exactly through `ix_client_phone_normalized`.
+            client_conditions = [search_client.phone_normalized == phone]
+        elif len(phone_digits) >= 3:
+            phone_expression = literal_column(
+                PHONE_SEARCH_EXPRESSION.format(table="search_client")
             )
-            .join(Client, Client.id_client == ClientBottleTransaction.id_client)
-            .where(
-                ClientBottleTransaction.fl_active == True,
+            client_conditions.append(phone_expression.like(literal(f"%{phone_digits}%")))
+
+        recorded_by_expression = literal_column(
+            RECORDED_BY_SEARCH_EXPRESSION.format(table="search_transaction")
+        )
+        matches = [
+            select(search_transaction.id_client_bottle_transaction).where(
+                search_transaction.id_client.in_(
+                    select(search_client.id_client).where(or_(*client_conditions))
+                )
+            ),
+            select(search_transaction.id_client_bottle_transaction).where(
                 or_(
-                    Client.name.ilike(term_pattern),
-                    Client.phone.ilike(term_pattern),
-                    ClientBottleTransaction.recorded_by.ilike(term_pattern),
-                    func.cast(ClientBottleTransaction.transaction_data_json, String).ilike(
-                        term_pattern
-                    ),
+                    recorded_by_expression.like(pattern),
+                    recorded_by_expression.op("%>")(normalized_term),
+                )
+            ),
+        ]
+        brand_ids = await self.get_brand_ids_by_term(term)
+        if brand_ids:
+            matches.append(
+                select(search_transaction.id_client_bottle_transaction).where(
+                    self._contains_any_brand(search_transaction.transaction_data_json, brand_ids)
+                )
+            )
+
+        search_filter = ClientBottleTransaction.id_client_bottle_transaction.in_(union(*matches))
+        relevance = func.greatest(
+            func.word_similarity(
+                normalized_term, literal_column(CLIENT_SEARCH_EXPRESSION.format(table="client"))
+            ),
+            func.word_similarity(
+                normalized_term,
+                literal_column(
+                    RECORDED_BY_SEARCH_EXPRESSION.format(table="client_bottle_transaction")
                 ),
+            ),
+        )
+        return search_filter, relevance
+
+    @staticmethod
+    def _contains_any_brand(transaction_data_json, brand_ids: List[int]) -> ColumnElement:
+        # One `@>` per brand so each branch is answered by the jsonb_path_ops GIN index.
+        return or_(
+            *[transaction_data_json.contains([{"brand_id": brand_id}]) for brand_id in brand_ids]
+        )
+
+    async def get_brand_ids_by_term(self, term: str) -> List[int]:
+        pattern = literal("%") + func.normalize_product_name(term) + literal("%")
+        result = await self.db.execute(
+            select(BottleBrand.id_bottle_brand).where(
+                func.normalize_product_name(BottleBrand.name).like(pattern)
             )
-            .order_by(ClientBottleTransaction.transaction_date.desc())
-            .limit(size)
-            .offset((page - 1) * size)
         )
-        transactions = await paginate(self.db, query, unique=False)
+        return result.scalars().all()
+
+    async def _paginate_transactions(
+        self,
+        query: Select,
+        page: int,
+        size: int,
+        relevance: Optional[ColumnElement] = None,
+        count: CountMode = CountMode.EXACT,
+        count_key: Optional[str] = None,
+    ) -> Union[Page[TransactionOutput], TransactionSlicePage]:
+        if relevance is not None:
+            query = query.order_by(relevance.desc())
+        query = query.order_by(
+            ClientBottleTransaction.transaction_date.desc(),
+            ClientBottleTransaction.id_client_bottle_transaction.desc(),
+        )
+        params = UnboundedParams(page=page, size=size)
+
+        if count == CountMode.NONE:
+            result = await self.db.execute(query.limit(size + 1).offset((page - 1) * size))
+            rows = result.all()
+            items = [TransactionOutput(**row._mapping) for row in rows[:size]]
+            await set_transaction_brand_names(items, self.db)
+            return TransactionSlicePage(
+                items=items, page=page, size=size, has_next=len(rows) > size
+            )
+
+        if count == CountMode.ESTIMATED:
+            total = await self._get_estimated_total(query, count_key)
+            result = await self.db.execute(create_paginate_query(query, params))
+            items = [TransactionOutput(**row._mapping) for row in result.all()]
+            await set_transaction_brand_names(items, self.db)
+            return Page[TransactionOutput].create(items, params, total=total)
+
+        with set_page(Page[TransactionOutput]):
+            transactions = await paginate(self.db, query, params=params, unique=False)
         return await process_transaction_data(transactions, self.db)
 
-    async def get_paginated_transactions_by_date(
-        self, page: int, size: int, date_filter: date
-    ) -> Page[TransactionOutput]:
-        query = (
-            select(
-                ClientBottleTransaction.id_client_bottle_transaction,
-                Client.name.label("client_name"),
-                Client.last_name.label("client_last_name"),
-                Client.phone.label("client_phone"),
-                ClientBottleTransaction.transaction_data_json.label("transaction_data"),
-                func.date(ClientBottleTransaction.transaction_date).label("transaction_date"),
-                ClientBottleTransaction.recorded_by,
+    async def _get_estimated_total(self, query: Select, count_key: Optional[str]) -> int:
+        """
+        Counts once per filter signature and reuses the result for
+        `transaction_count_cache_ttl` seconds.
+        """
+        total = transaction_count_cache.get(count_key) if count_key else None
+        if total is None:
+            total = await self.db.scalar(create_count_query(query))
+            if count_key:
+                transaction_count_cache.set(count_key, total)
+        return total
+
+    async def _filter_transactions(
+        self, query: Select, filters: TransactionFilters
+    ) -> Tuple[Select, Optional[ColumnElement]]:
+        relevance = None
+        if filters.term:
+            search_filter, relevance = await self._search_filter(filters.term)
+            query = query.where(search_filter)
+        # Plain comparisons on the indexed Date column keep the predicates sargable.
+        if filters.date_filter:
+            query = query.where(ClientBottleTransaction.transaction_date == filters.date_filter)
+        if filters.date_from:
+            query = query.where(ClientBottleTransaction.transaction_date >= filters.date_from)
+        if filters.date_to:
+            query = query.where(ClientBottleTransaction.transaction_date <= filters.date_to)
+        if filters.client_id:
+            query = query.where(ClientBottleTransaction.id_client == filters.client_id)
+        if filters.brand_ids:
+            query = query.where(
+                self._contains_any_brand(
+                    ClientBottleTransaction.transaction_data_json, filters.brand_ids
+                )
             )
-            .join(Client, Client.id_client == ClientBottleTransaction.id_client)
-            .where(
-                ClientBottleTransaction.fl_active == True,
-                func.date(ClientBottleTransaction.transaction_date) == date_filter,
+        return query, relevance
+
+    async def get_paginated_transactions(
+        self,
+        page: int,
+        size: int,
+        filters: TransactionFilters,
+        count: CountMode = CountMode.EXACT,
+    ) -> Union[Page[TransactionOutput], TransactionSlicePage]:
+        query, relevance = await self._filter_transactions(self._select_transactions(), filters)
+        return await self._paginate_transactions(
+            query, page, size, relevance, count, filters.model_dump_json()
+        )
+
+    async def get_keyset_transactions(
+        self,
+        limit: int,
+        filters: TransactionFilters,
+        cursor: Optional[TransactionCursor] = None,
+    ) -> TransactionCursorPage:
+        """
+        Seeks on the `(transaction_date, id_client_bottle_transaction)` key served by
+        `idx_transaction_date_id` (`idx_transaction_client_date_id` when filtering by client),
+        so every page costs the same regardless of its depth.
+        Search results keep the key order here, relevance ranking is only applied to
+        the offset listing.
+        """
+        query, _ = await self._filter_transactions(self._select_transactions(), filters)
+
+        key = tuple_(
+            ClientBottleTransaction.transaction_date,
+            ClientBottleTransaction.id_client_bottle_transaction,
+        )
+        backwards = cursor is not None and cursor.direction == CursorDirection.PREV
+        if cursor is not None:
+            position = tuple_(literal(cursor.transaction_date), literal(cursor.id))
+            query = query.where(key > position if backwards else key < position)
+        if backwards:
+            query = query.order_by(
+                ClientBottleTransaction.transaction_date.asc(),
+                ClientBottleTransaction.id_client_bottle_transaction.asc(),
+            )
+        else:
+            query = query.order_by(
+                ClientBottleTransaction.transaction_date.desc(),
+                ClientBottleTransaction.id_client_bottle_transaction.desc(),
             )
-            .order_by(ClientBottleTransaction.transaction_date.desc())
-            .limit(size)
-            .offset((page - 1) * size)
+
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+
+        items = [TransactionOutput(**row._mapping) for row in rows]
+        await set_transaction_brand_names(items, self.db)
+
+        has_next = True if backwards else has_more
+        has_prev = has_more if backwards else cursor is not None
+        return TransactionCursorPage(
+            items=items,
+            limit=limit,
+            next_cursor=(
+                encode_cursor(self._cursor_for(items[-1], CursorDirection.NEXT))
+                if items and has_next
+                else None
+            ),
+            prev_cursor=(
+                encode_cursor(self._cursor_for(items[0], CursorDirection.PREV))
+                if items and has_prev
+                else None
+            ),
         )
-        transactions = await paginate(self.db, query, unique=False)
-        return await process_transaction_data(transactions, self.db)
 
-    async def get_client(self, name: str, last_name: str) -> Optional[Client]:
-        name_pattern = f"%{name}%" if name else None
-        last_name_pattern = f"%{last_name}%" if last_name else None
-        query = text(
-            """
-            SELECT *
-            FROM client
-            WHERE public.unaccent(LOWER(name)) LIKE public.unaccent(LOWER(:name)) AND public.unaccent(LOWER(last_name)) LIKE public.unaccent(LOWER(:last_name))
-            """
+    async def stream_transactions(
+        self, filters: TransactionFilters, batch_size: int
+    ) -> AsyncIterator[List[TransactionOutput]]:
+        """
+        Yields the filtered transactions in batches of `batch_size` read from a server-side
+        cursor, so memory stays flat no matter how many rows match. Brand names are resolved
+        once per batch.
+        """
+        query, _ = await self._filter_transactions(self._select_transactions(), filters)
+        query = query.order_by(
+            ClientBottleTransaction.transaction_date.desc(),
+            ClientBottleTransaction.id_client_bottle_transaction.desc(),
+        ).execution_options(yield_per=batch_size)
+
+        result = await self.db.stream(query)
+        async for rows in result.partitions():
+            items = [TransactionOutput(**row._mapping) for row in rows]
+            await set_transaction_brand_names(items, self.db)
+            yield items
+
+    @staticmethod
+    def _cursor_for(item: TransactionOutput, direction: CursorDirection) -> TransactionCursor:
+        return TransactionCursor(
+            transaction_date=item.transaction_date,
+            id=item.id_client_bottle_transaction,
+            direction=direction,
         )
+
+    async def get_client(self, name: str, last_name: str) -> Optional[Client]:
         result = await self.db.execute(
-            query, {"name": name_pattern, "last_name": last_name_pattern}
+            select(Client).where(Client.identity_key == func.client_identity_key(name, last_name))
         )
-        client_dict = await get_first_record_as_dict(result)
-        if client_dict and client_dict != {}:
-            return Client(**client_dict)
-        return None
+        return result.scalars().one_or_none()
 
-    async def post_client(self, data: TransactionCreateInput, user: SessionPayload) -> Client:
-        new_client = Client(
+    async def get_or_post_client(
+        self, data: TransactionCreateInput, user: SessionPayload
+    ) -> Client:
+        """
+        Single `INSERT ... ON CONFLICT` on the unique identity key: concurrent requests for
+        the same new client end up with the same row. The conflict branch is a no-op update
+        so the existing row is returned as well. Committing is left to the caller.
+        """
+        query = pg_insert(Client).values(
             name=data.client_name,
             last_name=data.last_name,
             phone=data.client_phone,
+            phone_normalized=func.normalize_phone_br(data.client_phone),
             creation_user_id=user.id_user,
+            identity_key=func.client_identity_key(data.client_name, data.last_name),
         )
-        self.db.add(new_client)
-        await self.db.commit()
-        await self.db.refresh(new_client)
-        return new_client
+        query = query.on_conflict_do_update(
+            index_elements=[Client.identity_key],
+            set_={"identity_key": query.excluded.identity_key},
+        ).returning(Client)
+        return await self.db.scalar(query, execution_options={"populate_existing": True})
 
-    async def get_or_post_client(
-        self, data: TransactionCreateInput, user: SessionPayload
-    ) -> Client:
-        client = await self.get_client(data.client_name, data.last_name)
-        if not client:
-            client = await self.post_client(data, user)
-        return client
-
-    async def get_or_post_bottle_brand(
-        self, item: BottleBrandInput, user: SessionPayload
-    ) -> BottleBrand:
+    async def get_or_post_bottle_brands(
+        self, items: List[BottleBrandInput], user: SessionPayload
+    ) -> List[BottleBrandOutput]:
+        """
+        Resolves the brand of every item, in order. Brands are served from `bottle_brand_cache`
+        when possible; the rest are loaded with one exact-match query and names that do not
+        exist yet are created. Brands created here are not cached until a later lookup finds
+        them committed.
+        """
         brand_repository: _BottleBrandRepository = BottleBrandRepository(self.db)
-        brand = await brand_repository.get_bottle_brand(item.brand_name, item.brand_id)
-        if not brand:
-            brand = await brand_repository.create_bottle_brand(
-                creation_user_id=user.id_user, name=item.brand_name
+        keys = [bottle_brand_cache_key(item.brand_name, item.brand_id) for item in items]
+        brands = {key: bottle_brand_cache.get(key) for key in keys}
+        missing: Dict[Tuple, BottleBrandInput] = {}
+        for key, item in zip(keys, items):
+            if brands[key] is None:
+                missing.setdefault(key, item)
+        created = self.db.info.setdefault("created_bottle_brand_ids", set())
+
+        if missing:
+            by_id, by_name = await brand_repository.get_bottle_brands(
+                ids=[item.brand_id for item in missing.values() if item.brand_id],
+                names=[item.brand_name for item in missing.values() if not item.brand_id],
             )
-        return brand
+            for key, item in missing.items():
+                if item.brand_id:
+                    brand = by_id.get(item.brand_id)
+                    if brand is None:
+                        raise HTTPException(status_code=404, detail="Marca não encontrada.")
+                else:
+                    brand = by_name.get(item.brand_name)
+                if brand is None:
+                    await self._warn_similar_bottle_brands(brand_repository, item.brand_name)
+                    brand = await brand_repository.get_or_insert_bottle_brand(
+                        creation_user_id=user.id_user, name=item.brand_name
+                    )
+                    created.add(brand.id_bottle_brand)
+                brands[key] = BottleBrandOutput.model_validate(brand)
+                # A brand created earlier in this session may still be rolled back.
+                if brand.id_bottle_brand not in created:
+                    cache_bottle_brand(brands[key], item.brand_name)
+        return [brands[key] for key in keys]
+
+    async def _warn_similar_bottle_brands(
+        self, brand_repository: _BottleBrandRepository, name: str
+    ):
+        similar = await brand_repository.suggest_bottle_brands(
+            name, limit=3, min_similarity=SETTINGS.bottle_brand_duplicate_similarity
+        )
+        if similar:
+            names = ", ".join(f"'{brand.name}' ({score:.2f})" for brand, score, _ in similar)
+            self.logger.warning(f"Creating brand '{name}' similar to existing brands: {names}")
 
     async def create_transaction(
         self, client_id: int, transaction_data_json: list, recorded_by: Optional[str], id_user: int
-    ) -> ClientBottleTransaction:
-        try:
-            new_transaction = await ClientBottleTransaction.create(
-                creation_user_id=id_user,
-                id_client=client_id,
-                transaction_data_json=transaction_data_json,
-                recorded_by=recorded_by,
+    ) -> int:
+        """
+        Inserts the transaction and its items with one statement each and returns the new id.
+        Committing is left to the caller.
+        """
+        row = (
+            await self.db.execute(
+                insert(ClientBottleTransaction)
+                .values(
+                    creation_user_id=id_user,
+                    id_client=client_id,
+                    transaction_data_json=transaction_data_json,
+                    recorded_by=recorded_by,
+                )
+                .returning(
+                    ClientBottleTransaction.id_client_bottle_transaction,
+                    ClientBottleTransaction.transaction_date,
+                )
             )
-            self.db.add(new_transaction)
-            await self.db.flush()
-            await self.db.refresh(new_transaction)
-            await self.db.commit()
+        ).one()
+        await self._insert_transaction_items(
+            row.id_client_bottle_transaction,
+            client_id,
+            row.transaction_date,
+            True,
+            transaction_data_json,
+            id_user,
+        )
+        return row.id_client_bottle_transaction
 
-            return new_transaction
-        except Exception as e:
-            await self.db.rollback()
-            self.logger.error(f"Error creating transaction: {e}")
-            raise e
+    async def bulk_create_transactions(
+        self, transactions: List[TransactionBulkInput], recorded_by: str, id_user: int
+    ) -> Tuple[int, List[int]]:
+        """
+        Loads every item line into a temporary staging table with COPY, then resolves brands
+        and clients and merges transactions and items with set-based statements, whatever the
+        number of rows. Transactions referencing unknown brand ids are dropped from the load.
+
+        Returns the number of imported transactions and the indexes (in `transactions`) of the
+        rejected ones. Committing is left to the caller.
+        """
+        await self.db.execute(
+            text(
+                """
+                CREATE TEMPORARY TABLE bulk_transaction_staging (
+                    transaction_index            INT  NOT NULL,
+                    item_position                INT  NOT NULL,
+                    client_name                  TEXT NOT NULL,
+                    last_name                    TEXT NOT NULL,
+                    client_phone                 TEXT,
+                    transaction_date             DATE,
+                    recorded_by                  TEXT,
+                    brand_id                     INT,
+                    brand_name                   TEXT,
+                    quantity                     INT  NOT NULL,
+                    id_client                    INT,
+                    id_client_bottle_transaction INT
+                ) ON COMMIT DROP
+                """
+            )
+        )
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        async with raw_connection.driver_connection.cursor() as cursor:
+            async with cursor.copy(
+                """
+                COPY bulk_transaction_staging (
+                    transaction_index, item_position, client_name, last_name, client_phone,
+                    transaction_date, recorded_by, brand_id, brand_name, quantity
+                ) FROM STDIN
+                """
+            ) as copy:
+                for index, transaction in enumerate(transactions):
+                    for position, item in enumerate(transaction.transaction_data):
+                        await copy.write_row(
+                            (
+                                index,
+                                position,
+                                transaction.client_name,
+                                transaction.last_name,
+                                transaction.client_phone,
+                                transaction.transaction_date,
+                                transaction.recorded_by,
+                                item.brand_id,
+                                item.brand_name,
+                                item.quantity,
+                            )
+                        )
+        await self.db.execute(text("ANALYZE bulk_transaction_staging"))
+
+        result = await self.db.execute(
+            text(
+                """
+                DELETE FROM bulk_transaction_staging
+                WHERE transaction_index IN (
+                    SELECT s.transaction_index
+                    FROM bulk_transaction_staging s
+                    WHERE s.brand_id IS NOT NULL
+                    AND NOT EXISTS (
+                        SELECT 1 FROM bottle_brand bb WHERE bb.id_bottle_brand = s.brand_id
+                    )
+                )
+                RETURNING transaction_index
+                """
+            )
+        )
+        rejected = sorted(set(result.scalars().all()))
+
+        params = {"id_user": id_user, "recorded_by": recorded_by}
+        for statement in (
+            # Brands given by name that do not exist yet, once per normalized name.
+            """
+            INSERT INTO bottle_brand (name, creation_user_id)
+            SELECT DISTINCT ON (normalize_product_name(s.brand_name)) s.brand_name, :id_user
+            FROM bulk_transaction_staging s
+            WHERE s.brand_id IS NULL
+            AND NOT EXISTS (
+                SELECT 1
+                FROM bottle_brand bb
+                WHERE normalize_product_name(bb.name) = normalize_product_name(s.brand_name)
+            )
+            ORDER BY normalize_product_name(s.brand_name), s.transaction_index, s.item_position
+            ON CONFLICT DO NOTHING
+            """,
+            """
+            UPDATE bulk_transaction_staging s
+            SET brand_id = bb.id_bottle_brand
+            FROM bottle_brand bb
+            WHERE s.brand_id IS NULL
+            AND normalize_product_name(bb.name) = normalize_product_name(s.brand_name)
+            """,
+            """
+            UPDATE bulk_transaction_staging s
+            SET brand_name = bb.name
+            FROM bottle_brand bb
+            WHERE bb.id_bottle_brand = s.brand_id
+            """,
+            # Same identity key as get_or_post_client, so bulk and online writes share clients.
+            """
+            INSERT INTO client (
+                name, last_name, phone, phone_normalized, identity_key, creation_user_id
+            )
+            SELECT DISTINCT ON (client_identity_key(s.client_name, s.last_name))
+                s.client_name,
+                s.last_name,
+                s.client_phone,
+                normalize_phone_br(s.client_phone),
+                client_identity_key(s.client_name, s.last_name),
+                :id_user
+            FROM bulk_transaction_staging s
+            ORDER BY client_identity_key(s.client_name, s.last_name), s.transaction_index
+            ON CONFLICT (identity_key) DO NOTHING
+            """,
+            """
+            UPDATE bulk_transaction_staging s
+            SET id_client = c.id_client
+            FROM client c
+            WHERE c.identity_key = client_identity_key(s.client_name, s.last_name)
+            """,
+            """
+            UPDATE bulk_transaction_staging s
+            SET id_client_bottle_transaction = ids.id_client_bottle_transaction
+            FROM (
+                SELECT transaction_index,
+                    nextval(
+                        pg_get_serial_sequence(
+                            'client_bottle_transaction', 'id_client_bottle_transaction'
+                        )
+                    ) AS id_client_bottle_transaction
+                FROM (SELECT DISTINCT transaction_index FROM bulk_transaction_staging) t
+            ) ids
+            WHERE s.transaction_index = ids.transaction_index
+            """,
+        ):
+            await self.db.execute(text(statement), params)
+
+        result = await self.db.execute(
+            text(
+                """
+                INSERT INTO client_bottle_transaction (
+                    id_client_bottle_transaction, id_client, transaction_data_json,
+                    transaction_date, recorded_by, creation_user_id
+                )
+                SELECT s.id_client_bottle_transaction,
+                    min(s.id_client),
+                    jsonb_agg(
+                        jsonb_build_object(
+                            'brand_id', s.brand_id,
+                            'brand_name', s.brand_name,
+                            'quantity', s.quantity
+                        )
+                        ORDER BY s.item_position
+                    ),
+                    coalesce(min(s.transaction_date), current_timestamp_brazil()::date),
+                    coalesce(min(s.recorded_by), :recorded_by),
+                    :id_user
+                FROM bulk_transaction_staging s
+                GROUP BY s.id_client_bottle_transaction
+                """
+            ),
+            params,
+        )
+        imported = result.rowcount
+        await self.db.execute(
+            text(
+                """
+                INSERT INTO client_bottle_transaction_item (
+                    id_client_bottle_transaction, id_client, id_bottle_brand, quantity,
+                    transaction_date, fl_active, creation_user_id
+                )
+                SELECT s.id_client_bottle_transaction,
+                    s.id_client,
+                    s.brand_id,
+                    s.quantity,
+                    cbt.transaction_date,
+                    TRUE,
+                    :id_user
+                FROM bulk_transaction_staging s
+                    JOIN client_bottle_transaction cbt
+                        ON cbt.id_client_bottle_transaction = s.id_client_bottle_transaction
+                """
+            ),
+            params,
+        )
+        return imported, rejected
 
     async def get_transaction_output(self, id_client_bottle_transaction: int) -> TransactionOutput:
         query = text(
@@ -194,26 +680,11 @@ class _TransactionRepository:
         )
         transaction_dict = await get_first_record_as_dict(result)
         if transaction_dict and transaction_dict != {}:
-            transaction_data = transaction_dict["transaction_data"]
-            for item in transaction_data:
-                brand_name = await self.get_brand_name_by_id(item["brand_id"])
-                item["brand_name"] = brand_name
-            transaction_dict["transaction_data"] = transaction_data
-            return TransactionOutput(**transaction_dict)
+            transaction = TransactionOutput(**transaction_dict)
+            await set_transaction_brand_names([transaction], self.db)
+            return transaction
         return None
 
-    async def get_brand_name_by_id(self, brand_id: int) -> Optional[str]:
-        query = text(
-            """
-            SELECT name
-            FROM bottle_brand
-            WHERE id_bottle_brand = :brand_id
-            """
-        )
-        result = await self.db.execute(query, {"brand_id": brand_id})
-        brand_dict = await get_first_record_as_dict(result)
-        return brand_dict.get("name") if brand_dict else None
-
     async def get_transaction_by_id(
         self, transaction_id: int
     ) -> Optional[ClientBottleTransaction]:
@@ -243,17 +714,8 @@ class _TransactionRepository:
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        if client_name is not None:
-            client.name = client_name
-        if last_name is not None:
-            client.last_name = last_name
-        if client_phone is not None:
-            client.phone = client_phone
-        client.update_user_id = user.id_user
-
-        self.db.add(client)
-        await self.db.commit()
-        await self.db.refresh(client)
+        client_repository: _ClientRepository = ClientRepository(self.db)
+        await client_repository.update_client(client, client_name, last_name, client_phone, user)
 
     async def update_transaction(
         self,
@@ -271,18 +733,119 @@ class _TransactionRepository:
         transaction.update_user_id = id_user
 
         self.db.add(transaction)
-        await self.db.commit()
-        await self.db.refresh(transaction)
+        await self._replace_transaction_items(transaction, id_user)
+        await self.db.flush()
 
-    async def deactivate_transaction(self, transaction_id: int, user: SessionPayload):
-        transaction = await self.get_transaction_by_id(transaction_id)
-        if not transaction:
+    async def set_transaction_active(
+        self, transaction_id: int, fl_active: bool, user: SessionPayload
+    ) -> None:
+        updated = await self.set_transactions_active(
+            fl_active, user, TransactionStatusInput(ids=[transaction_id])
+        )
+        if not updated and not await self.db.scalar(
+            select(
+                exists().where(
+                    ClientBottleTransaction.id_client_bottle_transaction == transaction_id
+                )
+            )
+        ):
             raise HTTPException(status_code=404, detail="Transaction not found")
-        transaction.fl_active = False
-        transaction.update_user_id = user.id_user
-        self.db.add(transaction)
-        await self.db.commit()
-        await self.db.refresh(transaction)
+
+    async def set_transactions_active(
+        self, fl_active: bool, user: SessionPayload, target: TransactionStatusInput
+    ) -> List[int]:
+        """
+        Flips `fl_active` of every matching transaction and of its items with a single
+        `UPDATE ... RETURNING`. Transactions already in the requested state are left untouched,
+        so the returned ids are the ones that actually changed.
+        """
+        conditions = [ClientBottleTransaction.fl_active != fl_active]
+        if target.ids:
+            conditions.append(ClientBottleTransaction.id_client_bottle_transaction.in_(target.ids))
+        if target.client_id:
+            conditions.append(ClientBottleTransaction.id_client == target.client_id)
+        if target.date_from:
+            conditions.append(ClientBottleTransaction.transaction_date >= target.date_from)
+        if target.date_to:
+            conditions.append(ClientBottleTransaction.transaction_date <= target.date_to)
+        if target.brand_ids:
+            conditions.append(
+                self._contains_any_brand(
+                    ClientBottleTransaction.transaction_data_json, target.brand_ids
+                )
+            )
+
+        updated_transactions = (
+            update(ClientBottleTransaction)
+            .where(*conditions)
+            .values(fl_active=fl_active, update_user_id=user.id_user)
+            .returning(ClientBottleTransaction.id_client_bottle_transaction)
+            .cte("updated_transactions")
+        )
+        updated_items = (
+            update(ClientBottleTransactionItem)
+            .where(
+                ClientBottleTransactionItem.id_client_bottle_transaction.in_(
+                    select(updated_transactions.c.id_client_bottle_transaction)
+                )
+            )
+            .values(fl_active=fl_active, update_user_id=user.id_user)
+            .cte("updated_items")
+        )
+        result = await self.db.execute(
+            select(updated_transactions.c.id_client_bottle_transaction).add_cte(updated_items)
+        )
+        return result.scalars().all()
+
+    async def _replace_transaction_items(
+        self, transaction: ClientBottleTransaction, id_user: int
+    ) -> None:
+        """
+        Mirrors `transaction_data_json` into `client_bottle_transaction_item`. Runs inside the
+        caller's unit of work so both representations are committed together.
+        """
+        await self.db.execute(
+            delete(ClientBottleTransactionItem).where(
+                ClientBottleTransactionItem.id_client_bottle_transaction
+                == transaction.id_client_bottle_transaction
+            )
+        )
+        await self._insert_transaction_items(
+            transaction.id_client_bottle_transaction,
+            transaction.id_client,
+            transaction.transaction_date,
+            transaction.fl_active,
+            transaction.transaction_data_json,
+            id_user,
+        )
+
+    async def _insert_transaction_items(
+        self,
+        transaction_id: int,
+        client_id: int,
+        transaction_date: date,
+        fl_active: bool,
+        transaction_data_json: list,
+        id_user: int,
+    ) -> None:
+        if not transaction_data_json:
+            return
+        await self.db.execute(
+            insert(ClientBottleTransactionItem).values(
+                [
+                    {
+                        "creation_user_id": id_user,
+                        "id_client_bottle_transaction": transaction_id,
+                        "id_client": client_id,
+                        "id_bottle_brand": item["brand_id"],
+                        "quantity": item["quantity"],
+                        "transaction_date": transaction_date,
+                        "fl_active": fl_active,
+                    }
+                    for item in transaction_data_json
+                ]
+            )
+        )
 
 
 TransactionRepository = Annotated[_TransactionRepository, Depends(_TransactionRepository)]
@@ -0,0 +1,376 @@
+import logging
+import re
+from typing import Annotated, Dict, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    Select,
+    delete,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.exc import IntegrityError
+
+from server.configuration.database import DepDatabaseSession
+from server.model.client import Client
+from server.model.client_bottle_transaction import ClientBottleTransaction
+from server.schema.client_schema import ClientCursor, ClientCursorPage, ClientOutput
+from server.schema.transaction_schema import CursorDirection
+from server.utils.pagination import encode_cursor
+from server.utils.types import SessionPayload
+from server.utils.utils import normalize_phone_br
+
+# Must match the trigram index expressions, otherwise the planner cannot use them.
+CLIENT_SEARCH_EXPRESSION = (
+    "normalize_product_name(coalesce({table}.name, '') || ' ' || coalesce({table}.last_name, ''))"
+)
+PHONE_SEARCH_EXPRESSION = "regexp_replace({table}.phone, '[^0-9]', '', 'g')"
+
+# Phone-looking terms: digits and the usual separators only.
+PHONE_TERM_PATTERN = re.compile(r"^\+?[\d\s().-]+$")
+
+
+def phone_term(term: str) -> Optional[str]:
+    """
+    The normalized phone number when `term` is a full phone number, otherwise None.
+    """
+    if not PHONE_TERM_PATTERN.match(term.strip()):
+        return None
+    return normalize_phone_br(term)
+
+
+# Blocking keys of the duplicate search, each client appears once per block it belongs to.
+CLIENT_BLOCKS_CTE = """
+    WITH keyed AS (
+        SELECT id_client,
+            client_identity_key(name, last_name) AS identity_key,
+            right(regexp_replace(phone, '[^0-9]', '', 'g'), 8) AS phone_digits
+        FROM client
+    ), blocks AS (
+        SELECT id_client, identity_key, phone_digits,
+            'n:' || left(split_part(identity_key, ' ', 1), 4)
+                || '|' || left(regexp_replace(identity_key, '^.* ', ''), 2) AS block
+        FROM keyed
+        UNION ALL
+        SELECT id_client, identity_key, phone_digits, 'p:' || phone_digits
+        FROM keyed
+        WHERE length(phone_digits) = 8
+    ), sized_blocks AS (
+        SELECT *, count(*) OVER (PARTITION BY block) AS block_size
+        FROM blocks
+    )
+"""
+
+# Alphabetical listing key; `idx_client_sort_key` indexes it together with `id_client`.
+CLIENT_SORT_KEY = func.client_identity_key(Client.name, Client.last_name)
+
+
+class _ClientRepository:
+    def __init__(self, db: DepDatabaseSession):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+
+    def _select_clients(self) -> Select:
+        # Answered per row by an index-only scan on `idx_transaction_client_date_id`.
+        transaction_count = (
+            select(func.count())
+            .where(ClientBottleTransaction.id_client == Client.id_client)
+            .correlate(Client)
+            .scalar_subquery()
+        )
+        return select(
+            Client,
+            CLIENT_SORT_KEY.label("sort_key"),
+            transaction_count.label("transaction_count"),
+        )
+
+    @staticmethod
+    def _search_filter(term: str) -> ColumnElement:
+        """
+        A full phone number is matched exactly on `phone_normalized`. Anything else matches
+        the normalized full name (substring or word similarity) and, when the term carries at
+        least three digits, the phone digits, every branch served by a trigram index.
+        """
+        phone = phone_term(term)
+        if phone:
+            return Client.phone_normalized == phone
+        normalized_term = func.normalize_product_name(term)
+        name_expression = literal_column(CLIENT_SEARCH_EXPRESSION.format(table="client"))
+        conditions = [
+            name_expression.like(literal("%") + normalized_term + literal("%")),
+            name_expression.op("%>")(normalized_term),
+        ]
+        phone_digits = re.sub(r"\D", "", term)
+        if len(phone_digits) >= 3:
+            phone_expression = literal_column(PHONE_SEARCH_EXPRESSION.format(table="client"))
+            conditions.append(phone_expression.like(literal(f"%{phone_digits}%")))
+        return or_(*conditions)
+
+    @staticmethod
+    def _to_output(row: Row) -> ClientOutput:
+        client = ClientOutput.model_validate(row.Client)
+        client.transaction_count = row.transaction_count
+        return client
+
+    async def get_clients(
+        self, limit: int, term: Optional[str] = None, cursor: Optional[ClientCursor] = None
+    ) -> ClientCursorPage:
+        """
+        Seeks on the `(client_identity_key(name, last_name), id_client)` key, so every page
+        costs the same regardless of its depth. Search results keep the same order.
+        """
+        query = self._select_clients()
+        if term:
+            query = query.where(self._search_filter(term))
+
+        key = tuple_(CLIENT_SORT_KEY, Client.id_client)
+        backwards = cursor is not None and cursor.direction == CursorDirection.PREV
+        if cursor is not None:
+            position = tuple_(literal(cursor.sort_key), literal(cursor.id))
+            query = query.where(key < position if backwards else key > position)
+        if backwards:
+            query = query.order_by(CLIENT_SORT_KEY.desc(), Client.id_client.desc())
+        else:
+            query = query.order_by(CLIENT_SORT_KEY.asc(), Client.id_client.asc())
+
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+
+        has_next = True if backwards else has_more
+        has_prev = has_more if backwards else cursor is not None
+        return ClientCursorPage(
+            items=[self._to_output(row) for row in rows],
+            limit=limit,
+            next_cursor=(
+                encode_cursor(
+                    ClientCursor(sort_key=rows[-1].sort_key, id=rows[-1].Client.id_client)
+                )
+                if rows and has_next
+                else None
+            ),
+            prev_cursor=(
+                encode_cursor(
+                    ClientCursor(
+                        sort_key=rows[0].sort_key,
+                        id=rows[0].Client.id_client,
+                        direction=CursorDirection.PREV,
+                    )
+                )
+                if rows and has_prev
+                else None
+            ),
+        )
+
+    async def get_client(self, client_id: int) -> Optional[ClientOutput]:
+        result = await self.db.execute(self._select_clients().where(Client.id_client == client_id))
+        row = result.first()
+        return self._to_output(row) if row else None
+
+    async def get_clients_by_phone(self, phone: str) -> List[ClientOutput]:
+        result = await self.db.execute(
+            self._select_clients()
+            .where(Client.phone_normalized == phone)
+            .order_by(Client.id_client)
+        )
+        return [self._to_output(row) for row in result.all()]
+
+    async def get_client_by_id(self, client_id: int) -> Optional[Client]:
+        return await self.db.scalar(select(Client).where(Client.id_client == client_id))
+
+    async def update_client(
+        self,
+        client: Client,
+        name: Optional[str],
+        last_name: Optional[str],
+        phone: Optional[str],
+        user: SessionPayload,
+    ) -> None:
+        """
+        Applies the given fields and flushes them, keeping `identity_key` in step with the name.
+        Committing is left to the caller.
+        """
+        if name is not None:
+            client.name = name
+        if last_name is not None:
+            client.last_name = last_name
+        if name is not None or last_name is not None:
+            client.identity_key = func.client_identity_key(client.name, client.last_name)
+        if phone is not None:
+            client.phone = phone
+            client.phone_normalized = func.normalize_phone_br(phone)
+        client.update_user_id = user.id_user
+
+        self.db.add(client)
+        try:
+            async with self.db.begin_nested():
+                await self.db.flush()
+        except IntegrityError:
+            raise HTTPException(
+                status_code=400, detail="Já existe um cliente com esse nome e sobrenome."
+            )
+        await self.db.refresh(client)
+
+    async def count_clients(self) -> int:
+        return await self.db.scalar(select(func.count()).select_from(Client))
+
+    async def find_duplicate_client_pairs(
+        self, min_similarity: float, phone_min_similarity: float, max_block_size: int
+    ) -> Tuple[List[Row], int]:
+        """
+        Candidate duplicate pairs `(id_a, id_b, score)`. Clients are only compared inside
+        their blocks (same first four letters of the first name and first two of the last
+        word, or same last eight phone digits), which keeps the comparison far from O(n²).
+        Blocks bigger than `max_block_size` are skipped and counted in the second value.
+        """
+        params = {"max_block_size": max_block_size}
+        pairs = await self.db.execute(
+            text(
+                CLIENT_BLOCKS_CTE
+                + """
+                SELECT a.id_client AS id_a,
+                    b.id_client AS id_b,
+                    similarity(a.identity_key, b.identity_key) AS score
+                FROM sized_blocks a
+                    JOIN sized_blocks b ON b.block = a.block AND b.id_client > a.id_client
+                WHERE a.block_size <= :max_block_size
+                AND (
+                    similarity(a.identity_key, b.identity_key) >= :min_similarity
+                    OR (
+                        a.phone_digits = b.phone_digits
+                        AND similarity(a.identity_key, b.identity_key) >= :phone_min_similarity
+                    )
+                )
+                """
+            ),
+            {
+                **params,
+                "min_similarity": min_similarity,
+                "phone_min_similarity": phone_min_similarity,
+            },
+        )
+        skipped = await self.db.scalar(
+            text(
+                CLIENT_BLOCKS_CTE
+                + """
+                SELECT count(DISTINCT block) FROM sized_blocks WHERE block_size > :max_block_size
+                """
+            ),
+            params,
+        )
+        return pairs.all(), skipped
+
+    async def get_clients_by_ids(self, client_ids: List[int]) -> List[Row]:
+        result = await self.db.execute(
+            self._select_clients().where(Client.id_client.in_(client_ids))
+        )
+        return result.all()
+
+    async def merge_clients(
+        self, merges: Dict[int, int], id_user: int, batch_size: int
+    ) -> Tuple[int, int]:
+        """
+        Moves the transactions and items of every client in `merges` (duplicate id -> kept id)
+        to the kept client, `batch_size` rows per committed UPDATE, then copies a missing phone
+        over, deletes the duplicates and gives kept clients their identity key when it is free.
+        An interrupted run can be repeated. Returns the transactions and items moved.
+        """
+        mapping = {"duplicate_ids": list(merges), "keep_ids": list(merges.values())}
+        moved = []
+        for table, key in (
+            ("client_bottle_transaction", "id_client_bottle_transaction"),
+            ("client_bottle_transaction_item", "id_client_bottle_transaction_item"),
+        ):
+            query = text(
+                f"""
+                WITH merge AS (
+                    SELECT * FROM unnest(
+                        CAST(:duplicate_ids AS int[]), CAST(:keep_ids AS int[])
+                    ) AS merge(id_client, id_keep)
+                ), batch AS (
+                    SELECT t.{key}, merge.id_keep
+                    FROM {table} t
+                        JOIN merge ON merge.id_client = t.id_client
+                    LIMIT :batch_size
+                )
+                UPDATE {table} t
+                SET id_client      = batch.id_keep,
+                    update_user_id = :id_user
+                FROM batch
+                WHERE t.{key} = batch.{key}
+                """
+            )
+            total = 0
+            while True:
+                result = await self.db.execute(
+                    query, {**mapping, "batch_size": batch_size, "id_user": id_user}
+                )
+                await self.db.commit()
+                if not result.rowcount:
+                    break
+                total += result.rowcount
+            moved.append(total)
+
+        await self.db.execute(
+            text(
+                """
+                WITH merge AS (
+                    SELECT * FROM unnest(
+                        CAST(:duplicate_ids AS int[]), CAST(:keep_ids AS int[])
+                    ) AS merge(id_client, id_keep)
+                ), phones AS (
+                    SELECT DISTINCT ON (merge.id_keep) merge.id_keep, c.phone
+                    FROM merge
+                        JOIN client c ON c.id_client = merge.id_client
+                    WHERE c.phone IS NOT NULL
+                    ORDER BY merge.id_keep, c.id_client DESC
+                )
+                UPDATE client c
+                SET phone            = phones.phone,
+                    phone_normalized = normalize_phone_br(phones.phone)
+                FROM phones
+                WHERE c.id_client = phones.id_keep
+                AND c.phone IS NULL
+                """
+            ),
+            mapping,
+        )
+        await self.db.execute(delete(Client).where(Client.id_client.in_(mapping["duplicate_ids"])))
+        # Kept clients whose key was left NULL because a duplicate held it take it over now.
+        await self.db.execute(
+            text(
+                """
+                UPDATE client c
+                SET identity_key = free_key.identity_key
+                FROM (
+                    SELECT DISTINCT ON (client_identity_key(name, last_name))
+                        id_client,
+                        client_identity_key(name, last_name) AS identity_key
+                    FROM client
+                    WHERE id_client = ANY(CAST(:keep_ids AS int[]))
+                    AND identity_key IS NULL
+                    ORDER BY client_identity_key(name, last_name), id_client
+                ) free_key
+                WHERE c.id_client = free_key.id_client
+                AND NOT EXISTS (
+                    SELECT 1 FROM client other WHERE other.identity_key = free_key.identity_key
+                )
+                """
+            ),
+            mapping,
+        )
+        await self.db.commit()
+        return moved[0], moved[1]
+
+
+ClientRepository = Annotated[_ClientRepository, Depends(_ClientRepository)]
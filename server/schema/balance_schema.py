@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class BrandBalanceOutput(BaseModel):
+    id_bottle_brand: int
+    brand_name: str
+    quantity: int
+    last_movement_at: datetime
+
+
+class ClientBalanceOutput(BaseModel):
+    id_client: int
+    total_quantity: int
+    brands: List[BrandBalanceOutput]
+
+
+class BalanceOutput(BrandBalanceOutput):
+    id_client: int
+    client_name: Optional[str] = None
+    client_last_name: Optional[str] = None
+
+
+class BalanceCursor(BaseModel):
+    quantity: int
+    id_client: int
+    id_bottle_brand: int
+
+
+class BalanceCursorPage(BaseModel):
+    items: List[BalanceOutput]
+    limit: int
+    next_cursor: Optional[str] = None
+
+
+class BalanceRebuildResult(BaseModel):
+    corrected: int
+    removed: int
+    elapsed_seconds: float
@@ -21,6 +21,24 @@ class BottleBrandOutput(BaseModel):
         from_attributes = True
 
 
+class BottleBrandSuggestion(BottleBrandOutput):
+    score: float = Field(
+        ..., description="Similaridade por trigramas com o termo buscado (0 a 1)."
+    )
+    is_prefix: bool = Field(..., description="Se o nome da marca começa com o termo buscado.")
+
+
+class BottleBrandStockOutput(BottleBrandOutput):
+    lent: int = Field(..., description="Garrafas emprestadas em todas as transações.")
+    returned: int = Field(..., description="Garrafas de transações inativas (devolvidas).")
+    outstanding: int = Field(..., description="Garrafas ainda com os clientes.")
+
+
+class BottleBrandStockDiff(BottleBrandStockOutput):
+    expected_lent: int
+    expected_returned: int
+
+
 class BottleBrandUpdate(BaseModel):
     id_bottle_brand: Optional[int] = Field(None)
     name: Optional[str] = Field(None)
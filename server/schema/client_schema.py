@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from server.schema.transaction_schema import CursorDirection
+
+
+class ClientOutput(BaseModel):
+    id_client: int
+    name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone: Optional[str] = None
+    phone_normalized: Optional[str] = None
+    fl_active: bool
+    created_at: datetime
+    transaction_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+
+class ClientCursor(BaseModel):
+    sort_key: str
+    id: int
+    direction: CursorDirection = CursorDirection.NEXT
+
+
+class ClientCursorPage(BaseModel):
+    items: List[ClientOutput]
+    limit: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class ClientUpdateInput(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, description="Nome do cliente.")
+    last_name: Optional[str] = Field(None, min_length=1, description="Sobrenome do cliente.")
+    phone: Optional[str] = Field(None, description="Telefone do cliente.")
+
+    @model_validator(mode="before")
+    @classmethod
+    def validate_fields(cls, values):
+        if not any(values.get(field) is not None for field in ["name", "last_name", "phone"]):
+            raise ValueError("Pelo menos um campo deve ser fornecido para atualização.")
+        return values
+
+
+class ClientDuplicateCluster(BaseModel):
+    keep_id: int = Field(..., description="Cliente que recebe as transações dos demais.")
+    ids: List[int] = Field(..., description="Todos os clientes do grupo, incluindo `keep_id`.")
+    names: List[str]
+    score: float = Field(..., description="Menor similaridade entre os pares que formam o grupo.")
+    approved: bool = Field(False, description="Apenas grupos aprovados são mesclados.")
+
+
+class ClientDuplicateReport(BaseModel):
+    clients: int
+    clusters: List[ClientDuplicateCluster]
+    skipped_blocks: int
+    elapsed_seconds: float
+    seconds_per_100k_clients: float
+
+
+class ClientMergeResult(BaseModel):
+    clusters: int
+    clients_merged: int
+    transactions_moved: int
+    items_moved: int
+    elapsed_seconds: float
@@ -1,8 +1,9 @@
 from datetime import date
-from typing import List, Optional
+from enum import Enum
+from typing import Annotated, List, Literal, Optional, Union
 
 from fastapi import HTTPException
-from pydantic import BaseModel, EmailStr, field_validator, model_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 
 from server.model.role import UserRole
 
@@ -26,6 +27,77 @@ class TransactionOutput(BaseModel):
         from_attributes = True
 
 
+class TransactionFilters(BaseModel):
+    term: Optional[str] = None
+    date_filter: Optional[date] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    client_id: Optional[int] = None
+    brand_ids: Optional[List[int]] = None
+
+    @model_validator(mode="after")
+    def validate_date_range(self):
+        if self.date_from and self.date_to and self.date_from > self.date_to:
+            raise HTTPException(
+                status_code=400,
+                detail="O campo 'date_from' deve ser anterior ou igual a 'date_to'.",
+            )
+        return self
+
+
+class CountMode(str, Enum):
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    NONE = "none"
+
+
+class TransactionSlicePage(BaseModel):
+    items: List[TransactionOutput]
+    page: int
+    size: int
+    has_next: bool
+
+
+class CursorDirection(str, Enum):
+    NEXT = "next"
+    PREV = "prev"
+
+
+class TransactionCursor(BaseModel):
+    transaction_date: date
+    id: int
+    direction: CursorDirection = CursorDirection.NEXT
+
+
+class TransactionCursorPage(BaseModel):
+    items: List[TransactionOutput]
+    limit: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    JSON = "json"
+
+
+class TransactionExportRow(BaseModel):
+    id_client_bottle_transaction: int
+    transaction_date: Optional[date] = None
+    client_name: Optional[str] = None
+    client_last_name: Optional[str] = None
+    client_phone: Optional[str] = None
+    recorded_by: Optional[str] = None
+    brand_id: Optional[int] = None
+    brand_name: Optional[str] = None
+    quantity: Optional[int] = None
+
+
 class UserOut(BaseModel):
     id_user: int
     username: str
@@ -65,6 +137,25 @@ class TransactionCreateInput(BaseModel):
     transaction_data: List[BottleBrandInput]
 
 
+class TransactionBulkInput(TransactionCreateInput):
+    transaction_date: Optional[date] = None
+    recorded_by: Optional[str] = None
+
+
+class TransactionBulkError(BaseModel):
+    row: int
+    detail: str
+
+
+class TransactionBulkResult(BaseModel):
+    received: int
+    imported: int
+    failed: int
+    errors: List[TransactionBulkError]
+    elapsed_seconds: float
+    rows_per_second: float
+
+
 class TransactionUpdateInput(BaseModel):
     client_name: Optional[str] = None
     last_name: Optional[str] = None
@@ -87,3 +178,84 @@ class TransactionUpdateInput(BaseModel):
         if value is not None and len(value) == 0:
             raise ValueError("transaction_data deve conter pelo menos um item.")
         return value
+
+
+class TransactionStatusInput(BaseModel):
+    ids: Optional[List[int]] = None
+    client_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    brand_ids: Optional[List[int]] = None
+
+    @model_validator(mode="after")
+    def validate_target(self):
+        if not any([self.ids, self.client_id, self.date_from, self.date_to, self.brand_ids]):
+            raise HTTPException(
+                status_code=400,
+                detail="Informe os ids das transações ou ao menos um filtro.",
+            )
+        if self.date_from and self.date_to and self.date_from > self.date_to:
+            raise HTTPException(
+                status_code=400,
+                detail="O campo 'date_from' deve ser anterior ou igual a 'date_to'.",
+            )
+        return self
+
+
+class TransactionStatusOutput(BaseModel):
+    affected: int
+    ids: List[int]
+
+
+class TransactionBatchCreate(BaseModel):
+    op: Literal["create"]
+    ref: Optional[str] = None
+    data: TransactionCreateInput
+
+
+class TransactionBatchTarget(BaseModel):
+    transaction_id: Optional[int] = None
+    ref: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validate_target(self):
+        if (self.transaction_id is None) == (self.ref is None):
+            raise ValueError("Informe apenas um dos campos 'transaction_id' ou 'ref'.")
+        return self
+
+
+class TransactionBatchUpdate(TransactionBatchTarget):
+    op: Literal["update"]
+    data: TransactionUpdateInput
+
+
+class TransactionBatchStatus(TransactionBatchTarget):
+    op: Literal["deactivate", "activate"]
+
+
+TransactionBatchOperation = Annotated[
+    Union[TransactionBatchCreate, TransactionBatchUpdate, TransactionBatchStatus],
+    Field(discriminator="op"),
+]
+
+
+class TransactionBatchInput(BaseModel):
+    operations: List[TransactionBatchOperation] = Field(min_length=1, max_length=500)
+    atomic: bool = False
+
+
+class TransactionBatchResult(BaseModel):
+    index: int
+    op: str
+    success: bool
+    status_code: Optional[int] = None
+    transaction_id: Optional[int] = None
+    detail: Optional[str] = None
+    transaction: Optional[TransactionOutput] = None
+
+
+class TransactionBatchOutput(BaseModel):
+    committed: bool
+    succeeded: int
+    failed: int
+    results: List[TransactionBatchResult]
@@ -0,0 +1,81 @@
+import logging
+import time
+from typing import Annotated, Optional
+
+from fastapi import Depends, HTTPException, status
+
+from server.configuration.database import DepDatabaseSession
+from server.repository.balance_repository import BalanceRepository, _BalanceRepository
+from server.repository.client_repository import ClientRepository, _ClientRepository
+from server.schema.balance_schema import (
+    BalanceCursor,
+    BalanceCursorPage,
+    BalanceRebuildResult,
+    ClientBalanceOutput,
+)
+from server.utils.pagination import decode_cursor
+from server.utils.types import SessionPayload
+
+
+class _BalanceService:
+    def __init__(self, db: DepDatabaseSession):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+        self.repository: _BalanceRepository = BalanceRepository(db)
+
+    async def get_client_balance(
+        self, user: SessionPayload, client_id: int
+    ) -> ClientBalanceOutput:
+        brands = await self.repository.get_client_balance(client_id)
+        if not brands:
+            client_repository: _ClientRepository = ClientRepository(self.db)
+            if not await client_repository.get_client_by_id(client_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado."
+                )
+        return ClientBalanceOutput(
+            id_client=client_id,
+            total_quantity=sum(brand.quantity for brand in brands),
+            brands=brands,
+        )
+
+    async def get_balances(
+        self,
+        user: SessionPayload,
+        limit: int,
+        min_quantity: int,
+        brand_id: Optional[int],
+        cursor: Optional[str],
+    ) -> BalanceCursorPage:
+        return await self.repository.get_balances(
+            limit,
+            min_quantity,
+            brand_id,
+            decode_cursor(cursor, BalanceCursor) if cursor else None,
+        )
+
+    async def rebuild_balances(self, dry_run: bool = False) -> BalanceRebuildResult:
+        started = time.perf_counter()
+        try:
+            corrected, removed = await self.repository.rebuild_balances(dry_run)
+            if dry_run:
+                await self.db.rollback()
+            else:
+                await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            self.logger.error(f"Error rebuilding client balances: {e}")
+            raise e
+
+        elapsed = time.perf_counter() - started
+        if corrected or removed:
+            self.logger.warning(
+                f"{'Found' if dry_run else 'Fixed'} {corrected} wrong and {removed} stale "
+                f"client balances in {elapsed:.2f}s"
+            )
+        return BalanceRebuildResult(
+            corrected=corrected, removed=removed, elapsed_seconds=round(elapsed, 3)
+        )
+
+
+BalanceService = Annotated[_BalanceService, Depends(_BalanceService)]
@@ -1,16 +1,27 @@
 import logging
-from typing import Annotated, List, Optional
+from typing import Annotated, List, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 
 from server.configuration.database import DepDatabaseSession
-from server.repository.bottle_brand_repository import BottleBrandRepository, _BottleBrandRepository
+from server.configuration.environment import SETTINGS
+from server.repository.bottle_brand_repository import (
+    BottleBrandRepository,
+    _BottleBrandRepository,
+    bottle_brand_cache,
+)
 from server.schema.bottle_brand_schema import (
     BottleBrandCreate,
     BottleBrandInput,
     BottleBrandOutput,
+    BottleBrandStockDiff,
+    BottleBrandStockOutput,
+    BottleBrandSuggestion,
     BottleBrandUpdate,
 )
+from server.utils.brand_catalog import brand_catalog, brand_catalog_etag
+from server.utils.cache import transaction_page_cache
 from server.utils.types import SessionPayload
 
 
@@ -29,9 +40,17 @@ class _BottleBrandService:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Uma marca com esse nome já existe.",
             )
-        new_brand = await self.repository.create_bottle_brand(
-            creation_user_id=user.id_user, name=data.name
-        )
+        try:
+            new_brand = await self.repository.create_bottle_brand(
+                creation_user_id=user.id_user, name=data.name
+            )
+        except IntegrityError:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uma marca com esse nome já existe.",
+            )
+        bottle_brand_cache.clear()
         return BottleBrandOutput.model_validate(new_brand)
 
     async def update_bottle_brand(
@@ -43,14 +62,25 @@ class _BottleBrandService:
                 status_code=status.HTTP_404_NOT_FOUND, detail="Marca não encontrada."
             )
 
-        if data.new_name and await self.repository.get_bottle_brand(name=data.new_name):
+        # Renaming a brand to a different spelling of its own name is allowed.
+        existing_brand = await self.repository.get_bottle_brand(name=data.new_name)
+        if existing_brand and existing_brand.id_bottle_brand != bottle_brand.id_bottle_brand:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Já existe uma marca com esse nome.",
             )
-        updated_brand = await self.repository.update_bottle_brand(
-            bottle_brand, update_user_id=user.id_user, new_name=data.new_name
-        )
+        try:
+            updated_brand = await self.repository.update_bottle_brand(
+                bottle_brand, update_user_id=user.id_user, new_name=data.new_name
+            )
+        except IntegrityError:
+            await self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Já existe uma marca com esse nome.",
+            )
+        bottle_brand_cache.clear()
+        transaction_page_cache.bump()
         return BottleBrandOutput.model_validate(updated_brand)
 
     async def get_all_bottle_brands(
@@ -60,11 +90,42 @@ class _BottleBrandService:
         brands = await self.repository.get_all_bottle_brands()
         return [BottleBrandOutput.model_validate(brand) for brand in brands]
 
+    async def get_bottle_brand_catalog(
+        self, user: SessionPayload
+    ) -> Tuple[List[BottleBrandOutput], str]:
+        """
+        Returns every brand with its ETag, from the worker snapshot when it is available.
+        """
+        if brand_catalog.brands is not None:
+            return brand_catalog.brands, brand_catalog.etag
+        brands = await self.get_all_bottle_brands(user)
+        return brands, brand_catalog_etag(brands)
+
+    async def suggest_bottle_brands(
+        self, user: SessionPayload, term: str, limit: int
+    ) -> List[BottleBrandSuggestion]:
+        rows = await self.repository.suggest_bottle_brands(
+            term, limit, SETTINGS.bottle_brand_suggest_min_similarity
+        )
+        return [
+            BottleBrandSuggestion(
+                id_bottle_brand=brand.id_bottle_brand,
+                name=brand.name,
+                score=score,
+                is_prefix=is_prefix,
+            )
+            for brand, score, is_prefix in rows
+        ]
+
     async def get_bottle_brand(
-        self, user: SessionPayload, data: BottleBrandInput
+        self, user: SessionPayload, data: BottleBrandInput, fuzzy: bool = False
     ) -> Optional[BottleBrandOutput]:
         self.logger.info("Getting bottle brand by name or id")
-        bottle_brand = await self.repository.get_bottle_brand(data.name, data.id_bottle_brand)
+        if fuzzy and data.name:
+            matches = await self.repository.search_bottle_brands(data.name, limit=1)
+            bottle_brand = matches[0] if matches else None
+        else:
+            bottle_brand = await self.repository.get_bottle_brand(data.name, data.id_bottle_brand)
         if not bottle_brand:
             self.logger.error(
                 f"Bottle brand id: {data.id_bottle_brand} - name: {data.name} not found"
@@ -85,8 +146,57 @@ class _BottleBrandService:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Marca não encontrada.",
             )
+        if await self.repository.is_bottle_brand_in_use(bottle_brand.id_bottle_brand):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A marca possui transações registradas e não pode ser removida.",
+            )
         await self.repository.delete_bottle_brand(bottle_brand.id_bottle_brand)
+        bottle_brand_cache.clear()
+        transaction_page_cache.bump()
         return BottleBrandOutput.model_validate(bottle_brand)
 
+    async def get_bottle_brand_stock(self, user: SessionPayload) -> List[BottleBrandStockOutput]:
+        rows = await self.repository.get_bottle_brand_stock()
+        return [
+            BottleBrandStockOutput(
+                id_bottle_brand=row.id_bottle_brand,
+                name=row.name,
+                lent=row.lent,
+                returned=row.returned,
+                outstanding=row.lent - row.returned,
+            )
+            for row in rows
+        ]
+
+    async def check_bottle_brand_stock(self, fix: bool = False) -> List[BottleBrandStockDiff]:
+        try:
+            rows = await self.repository.check_bottle_brand_stock(fix)
+            if fix:
+                await self.db.commit()
+            else:
+                await self.db.rollback()
+        except Exception as e:
+            await self.db.rollback()
+            self.logger.error(f"Error checking bottle brand stock: {e}")
+            raise e
+
+        if rows:
+            self.logger.warning(
+                f"{'Fixed' if fix else 'Found'} wrong stock counters for {len(rows)} brands"
+            )
+        return [
+            BottleBrandStockDiff(
+                id_bottle_brand=row.id_bottle_brand,
+                name=row.name,
+                lent=row.lent,
+                returned=row.returned,
+                outstanding=row.lent - row.returned,
+                expected_lent=row.expected_lent,
+                expected_returned=row.expected_returned,
+            )
+            for row in rows
+        ]
+
 
 BottleBrandService = Annotated[_BottleBrandService, Depends(_BottleBrandService)]
@@ -1,27 +1,60 @@
+import asyncio
+import csv
+import io
+import json
 import logging
-from datetime import date
-from typing import Annotated, Optional
+import time
+from typing import Annotated, AsyncIterator, Awaitable, Dict, List, Optional, Set, TypeVar, Union
 
 from fastapi import Depends, HTTPException
 from fastapi_pagination import LimitOffsetPage, Page, add_pagination
 from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy.exc import NoResultFound
+from pydantic import ValidationError
+from sqlalchemy.exc import NoResultFound, SQLAlchemyError
 
-from server.configuration.database import DepDatabaseSession
+from server.configuration.database import AsyncSessionLocal, DepDatabaseSession
+from server.configuration.environment import SETTINGS
 from server.model.client import Client
 from server.model.client_bottle_transaction import ClientBottleTransaction
+from server.model.role import UserRole
 from server.repository.client_bottle_transaction_repository import (
     TransactionRepository,
     _TransactionRepository,
 )
 from server.schema.transaction_schema import (
     BottleBrandData,
+    CountMode,
+    ExportFormat,
+    ImportFormat,
+    TransactionBatchCreate,
+    TransactionBatchInput,
+    TransactionBatchOperation,
+    TransactionBatchOutput,
+    TransactionBatchResult,
+    TransactionBatchUpdate,
+    TransactionBulkError,
+    TransactionBulkInput,
+    TransactionBulkResult,
     TransactionCreateInput,
+    TransactionCursor,
+    TransactionCursorPage,
+    TransactionExportRow,
+    TransactionFilters,
     TransactionOutput,
+    TransactionSlicePage,
+    TransactionStatusInput,
+    TransactionStatusOutput,
     TransactionUpdateInput,
 )
+from server.utils.cache import transaction_page_cache
+from server.utils.error import ClientBottleException, CodigoErro
+from server.utils.pagination import decode_cursor
 from server.utils.types import SessionPayload
 
+T = TypeVar("T")
+
+_revalidation_tasks: Set[asyncio.Task] = set()
+
 
 class _TransactionService:
     def __init__(self, db: DepDatabaseSession):
@@ -30,59 +63,303 @@ class _TransactionService:
         self.repository: _TransactionRepository = TransactionRepository(db)
 
     async def get_paginated_transactions(
-        self, page: int, size: int, term: Optional[str] = None, date_filter: Optional[date] = None
-    ) -> Page[TransactionOutput]:
-        if not term and not date_filter:
-            self.logger.info("Getting all transactions")
-            return await self.repository.get_paginated_transactions(page, size)
-        elif term and not date_filter:
-            self.logger.info(f"Searching transactions with term: {term}")
-            return await self.repository.get_paginated_transactions_by_term(page, size, term)
-        else:
-            self.logger.info(f"Filtering transactions by date: {date_filter}")
-            return await self.repository.get_paginated_transactions_by_date(
-                page, size, date_filter
+        self,
+        page: int,
+        size: int,
+        filters: TransactionFilters,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        count: CountMode = CountMode.EXACT,
+    ) -> Union[Page[TransactionOutput], TransactionCursorPage, TransactionSlicePage]:
+        args = (page, size, filters, cursor, limit, count)
+        key = (filters.model_dump_json(), page, size, cursor, limit, count)
+        cached, fresh = transaction_page_cache.get(
+            key, allow_stale=SETTINGS.transaction_cache_serve_stale
+        )
+        if fresh:
+            return cached
+        if cached is not None:
+            self.logger.info("Serving a stale transactions page while it is revalidated")
+            if transaction_page_cache.start_revalidation(key):
+                task = asyncio.create_task(self._revalidate_page(key, *args))
+                _revalidation_tasks.add(task)
+                task.add_done_callback(_revalidation_tasks.discard)
+            return cached
+
+        version = transaction_page_cache.version
+        result = await self._get_paginated_transactions(*args)
+        transaction_page_cache.set(key, result, version)
+        return result
+
+    @classmethod
+    async def _revalidate_page(cls, key: tuple, *args):
+        try:
+            async with AsyncSessionLocal() as session:
+                version = transaction_page_cache.version
+                result = await cls(session)._get_paginated_transactions(*args)
+                transaction_page_cache.set(key, result, version)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Error revalidating transactions page: {e}")
+        finally:
+            transaction_page_cache.finish_revalidation(key)
+
+    async def _get_paginated_transactions(
+        self,
+        page: int,
+        size: int,
+        filters: TransactionFilters,
+        cursor: Optional[str],
+        limit: Optional[int],
+        count: CountMode,
+    ) -> Union[Page[TransactionOutput], TransactionCursorPage, TransactionSlicePage]:
+        self.logger.info(f"Getting transactions with filters: {filters}")
+        if cursor is not None or limit is not None:
+            return await self.repository.get_keyset_transactions(
+                limit or size,
+                filters,
+                decode_cursor(cursor, TransactionCursor) if cursor else None,
             )
+        return await self.repository.get_paginated_transactions(page, size, filters, count)
+
+    @classmethod
+    async def export_transactions(
+        cls, filters: TransactionFilters, export_format: ExportFormat
+    ) -> AsyncIterator[str]:
+        """
+        Streams the filtered transactions, one line per bottle item. The export outlives the
+        request scoped session, so it reads through a session of its own.
+        """
+        logger = logging.getLogger(__name__)
+        logger.info(f"Exporting transactions as {export_format.value} with filters: {filters}")
+        fields = list(TransactionExportRow.model_fields)
+        if export_format == ExportFormat.CSV:
+            yield cls._to_csv([fields])
+
+        exported = 0
+        async with AsyncSessionLocal() as session:
+            repository = TransactionRepository(session)
+            async for transactions in repository.stream_transactions(
+                filters, SETTINGS.transaction_export_batch_size
+            ):
+                rows = [row for t in transactions for row in cls._flatten_transaction(t)]
+                exported += len(rows)
+                if export_format == ExportFormat.CSV:
+                    yield cls._to_csv([[getattr(row, field) for field in fields] for row in rows])
+                else:
+                    yield "".join(f"{row.model_dump_json()}\n" for row in rows)
+        logger.info(f"Exported {exported} transaction rows")
+
+    @staticmethod
+    def _flatten_transaction(transaction: TransactionOutput) -> List[TransactionExportRow]:
+        base = transaction.model_dump(exclude={"transaction_data"})
+        items = transaction.transaction_data or [BottleBrandData()]
+        return [TransactionExportRow(**base, **item.model_dump()) for item in items]
+
+    @staticmethod
+    def _to_csv(rows: List[list]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def get_cache_stats(self) -> dict:
+        return transaction_page_cache.stats()
 
     async def post_transaction(
         self, transaction_input: TransactionCreateInput, user: SessionPayload
+    ) -> TransactionOutput:
+        """
+        Client, new brands, the transaction and its items are written in one database
+        transaction, so a failure at any step leaves nothing behind.
+        """
+        self.logger.info(f"Creating transaction for client: {transaction_input.client_name}")
+        complete_data = await self._write(self._create_transaction(transaction_input, user))
+        self.logger.info(f"new transaction: {complete_data}")
+        return complete_data
+
+    async def _write(self, operation: Awaitable[T]) -> T:
+        """
+        Runs a write and commits it, or rolls everything back if any step fails.
+        """
+        try:
+            result = await operation
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            if not isinstance(e, HTTPException):
+                self.logger.error(f"Error writing transaction: {e}")
+            raise e
+        transaction_page_cache.bump()
+        return result
+
+    async def _create_transaction(
+        self, transaction_input: TransactionCreateInput, user: SessionPayload
     ) -> TransactionOutput:
         client = await self.repository.get_or_post_client(transaction_input, user)
 
         transaction_data_json = await self.prepare_transaction_data(transaction_input, user)
 
-        new_transaction = await self.repository.create_transaction(
+        transaction_id = await self.repository.create_transaction(
             client_id=client.id_client,
             transaction_data_json=transaction_data_json,
             recorded_by=user.full_name,
             id_user=user.id_user,
         )
-        if not new_transaction:
+        complete_data = await self.repository.get_transaction_output(transaction_id)
+        if not complete_data:
             raise NoResultFound("Transaction not found")
-        complete_data = await self.repository.get_transaction_output(
-            new_transaction.id_client_bottle_transaction
+        return complete_data
+
+    async def bulk_create_transactions(
+        self, payload: bytes, payload_format: ImportFormat, user: SessionPayload
+    ) -> TransactionBulkResult:
+        """
+        Imports a batch of transactions in one database transaction. Invalid rows are
+        reported in `errors` and left out, the remaining ones are loaded.
+        """
+        started = time.perf_counter()
+        records = self._parse_bulk_payload(payload, payload_format)
+        if len(records) > SETTINGS.transaction_bulk_max_rows:
+            raise HTTPException(
+                status_code=400,
+                detail=f"O limite é de {SETTINGS.transaction_bulk_max_rows} transações por envio.",
+            )
+
+        transactions: List[TransactionBulkInput] = []
+        rows: List[int] = []
+        errors: List[TransactionBulkError] = []
+        for row, record in records:
+            try:
+                transaction = TransactionBulkInput.model_validate(record)
+            except ValidationError as e:
+                detail = "; ".join(
+                    ": ".join(
+                        filter(None, [".".join(str(part) for part in error["loc"]), error["msg"]])
+                    )
+                    for error in e.errors()
+                )
+                errors.append(TransactionBulkError(row=row, detail=detail))
+                continue
+            except HTTPException as e:
+                errors.append(TransactionBulkError(row=row, detail=e.detail))
+                continue
+            except (AttributeError, TypeError):
+                errors.append(
+                    TransactionBulkError(row=row, detail="Formato de transação inválido.")
+                )
+                continue
+            if not transaction.transaction_data:
+                errors.append(
+                    TransactionBulkError(
+                        row=row, detail="A transação deve possuir ao menos um item."
+                    )
+                )
+                continue
+            transactions.append(transaction)
+            rows.append(row)
+
+        imported = 0
+        if transactions:
+            try:
+                imported, rejected = await self.repository.bulk_create_transactions(
+                    transactions, user.full_name, user.id_user
+                )
+                await self.db.commit()
+            except Exception as e:
+                await self.db.rollback()
+                self.logger.error(f"Error importing transactions: {e}")
+                raise e
+            transaction_page_cache.bump()
+            errors.extend(
+                TransactionBulkError(row=rows[index], detail="Marca não encontrada.")
+                for index in rejected
+            )
+
+        elapsed = time.perf_counter() - started
+        self.logger.info(
+            f"Imported {imported} of {len(records)} transactions in {elapsed:.2f}s "
+            f"by {user.username}"
+        )
+        return TransactionBulkResult(
+            received=len(records),
+            imported=imported,
+            failed=len(records) - imported,
+            errors=sorted(errors, key=lambda error: error.row),
+            elapsed_seconds=round(elapsed, 3),
+            rows_per_second=round(imported / elapsed, 1) if elapsed else 0.0,
         )
-        self.logger.info(f"new transaction: {complete_data}")
 
-        self.logger.info(f"Creating transaction for client: {transaction_input.client_name}")
-        return TransactionOutput.model_validate(complete_data)
+    @staticmethod
+    def _parse_bulk_payload(payload: bytes, payload_format: ImportFormat) -> List[tuple]:
+        """
+        Returns `(row, record)` pairs. JSON rows are the 1-based array positions. CSV takes
+        one line per item, lines sharing a `transaction_ref` form a single transaction (the
+        first one provides the client data) and rows are the line numbers.
+        """
+        try:
+            content = payload.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="O arquivo deve estar em UTF-8.")
+
+        if payload_format == ImportFormat.JSON:
+            try:
+                records = json.loads(content)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="JSON inválido.")
+            if not isinstance(records, list):
+                raise HTTPException(
+                    status_code=400, detail="O corpo deve ser uma lista de transações."
+                )
+            return list(enumerate(records, start=1))
+
+        grouped: Dict[str, tuple] = {}
+        for line, values in enumerate(csv.DictReader(io.StringIO(content)), start=2):
+            values = {key: value or None for key, value in values.items() if key}
+            reference = values.get("transaction_ref") or f"line:{line}"
+            if reference not in grouped:
+                grouped[reference] = (
+                    line,
+                    {
+                        "client_name": values.get("client_name"),
+                        "last_name": values.get("last_name"),
+                        "client_phone": values.get("client_phone"),
+                        "transaction_date": values.get("transaction_date"),
+                        "recorded_by": values.get("recorded_by"),
+                        "transaction_data": [],
+                    },
+                )
+            grouped[reference][1]["transaction_data"].append(
+                {
+                    "brand_id": values.get("brand_id"),
+                    "brand_name": values.get("brand_name"),
+                    "quantity": values.get("quantity"),
+                }
+            )
+        return list(grouped.values())
 
     async def prepare_transaction_data(
         self, transaction_input: TransactionCreateInput, user: SessionPayload
     ) -> list:
-        transaction_data_json = []
-        for item in transaction_input.transaction_data:
-            brand = await self.repository.get_or_post_bottle_brand(item, user)
-            if not brand.id_bottle_brand:
-                self.logger.error(f"Brand ID is null for brand: {brand.name}")
-                raise ValueError("Brand ID is null")
-            transaction_data_json.append(
-                {"brand_id": brand.id_bottle_brand, "quantity": item.quantity}
-            )
-        return transaction_data_json
+        brands = await self.repository.get_or_post_bottle_brands(
+            transaction_input.transaction_data, user
+        )
+        # The brand may come from a worker cache; `trg_client_bottle_transaction_brand_names`
+        # replaces `brand_name` with the current name when the row is written.
+        return [
+            {
+                "brand_id": brand.id_bottle_brand,
+                "brand_name": brand.name,
+                "quantity": item.quantity,
+            }
+            for item, brand in zip(transaction_input.transaction_data, brands)
+        ]
 
     async def update_transaction(
         self, transaction_id: int, transaction_input: TransactionUpdateInput, user: SessionPayload
+    ) -> TransactionOutput:
+        return await self._write(self._update_transaction(transaction_id, transaction_input, user))
+
+    async def _update_transaction(
+        self, transaction_id: int, transaction_input: TransactionUpdateInput, user: SessionPayload
     ) -> TransactionOutput:
         existing_transaction = await self.repository.get_transaction_by_id(transaction_id)
         if not existing_transaction:
@@ -116,7 +393,112 @@ class _TransactionService:
         return await self.repository.get_transaction_output(transaction_id)
 
     async def deactivate_transaction(self, transaction_id: int, user: SessionPayload):
-        await self.repository.deactivate_transaction(transaction_id, user)
+        await self._write(self.repository.set_transaction_active(transaction_id, False, user))
+
+    async def activate_transaction(self, transaction_id: int, user: SessionPayload):
+        await self._write(self.repository.set_transaction_active(transaction_id, True, user))
+
+    async def set_transactions_active(
+        self, target: TransactionStatusInput, fl_active: bool, user: SessionPayload
+    ) -> TransactionStatusOutput:
+        # A filter alone can match the whole table, so only administrators may omit `ids`.
+        if not target.ids and user.role != UserRole.ADMINISTRATOR:
+            raise ClientBottleException([CodigoErro.ADMIN_ONLY])
+        ids = await self._write(self.repository.set_transactions_active(fl_active, user, target))
+        self.logger.info(
+            f"{'Activated' if fl_active else 'Deactivated'} {len(ids)} transactions "
+            f"by {user.username}"
+        )
+        return TransactionStatusOutput(affected=len(ids), ids=ids)
+
+    async def run_batch(
+        self, batch: TransactionBatchInput, user: SessionPayload
+    ) -> TransactionBatchOutput:
+        """
+        Runs the operations in order inside one database transaction, each one under its own
+        savepoint: a failing operation is reported and undone without touching the others.
+        With `atomic`, any failure rolls the whole batch back instead.
+
+        Operations can target a transaction created earlier in the same batch through its
+        `ref`.
+        """
+        self.logger.info(f"Running batch of {len(batch.operations)} operations by {user.username}")
+        refs: Dict[str, int] = {}
+        results: List[TransactionBatchResult] = []
+        try:
+            for index, operation in enumerate(batch.operations):
+                result = TransactionBatchResult(index=index, op=operation.op, success=True)
+                try:
+                    async with self.db.begin_nested():
+                        await self._run_batch_operation(operation, refs, result, user)
+                except HTTPException as e:
+                    result = result.model_copy(
+                        update={"success": False, "status_code": e.status_code, "detail": e.detail}
+                    )
+                except SQLAlchemyError as e:
+                    self.logger.error(f"Error running batch operation {index}: {e}")
+                    result = result.model_copy(
+                        update={
+                            "success": False,
+                            "status_code": 500,
+                            "detail": "Erro ao executar a operação.",
+                        }
+                    )
+                results.append(result)
+
+            failed = sum(not result.success for result in results)
+            committed = not (batch.atomic and failed)
+            if committed:
+                await self.db.commit()
+            else:
+                await self.db.rollback()
+        except Exception as e:
+            await self.db.rollback()
+            self.logger.error(f"Error running batch: {e}")
+            raise e
+
+        if committed and failed < len(results):
+            transaction_page_cache.bump()
+        return TransactionBatchOutput(
+            committed=committed,
+            succeeded=len(results) - failed,
+            failed=failed,
+            results=results,
+        )
+
+    async def _run_batch_operation(
+        self,
+        operation: TransactionBatchOperation,
+        refs: Dict[str, int],
+        result: TransactionBatchResult,
+        user: SessionPayload,
+    ) -> None:
+        if isinstance(operation, TransactionBatchCreate):
+            result.transaction = await self._create_transaction(operation.data, user)
+            result.transaction_id = result.transaction.id_client_bottle_transaction
+            result.status_code = 201
+            if operation.ref:
+                refs[operation.ref] = result.transaction_id
+            return
+
+        transaction_id = operation.transaction_id
+        if transaction_id is None:
+            transaction_id = refs.get(operation.ref)
+            if transaction_id is None:
+                raise HTTPException(
+                    status_code=404, detail=f"Referência '{operation.ref}' não encontrada no lote."
+                )
+        result.transaction_id = transaction_id
+        result.status_code = 200
+
+        if isinstance(operation, TransactionBatchUpdate):
+            result.transaction = await self._update_transaction(
+                transaction_id, operation.data, user
+            )
+        else:
+            await self.repository.set_transaction_active(
+                transaction_id, operation.op == "activate", user
+            )
 
 
 TransactionService = Annotated[_TransactionService, Depends(_TransactionService)]
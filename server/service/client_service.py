@@ -0,0 +1,211 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Annotated, Dict, List, Optional
+
+from fastapi import Depends, HTTPException, status
+
+from server.configuration.database import DepDatabaseSession
+from server.repository.client_bottle_transaction_repository import (
+    TransactionRepository,
+    _TransactionRepository,
+)
+from server.repository.client_repository import ClientRepository, _ClientRepository
+from server.schema.client_schema import (
+    ClientCursor,
+    ClientCursorPage,
+    ClientDuplicateCluster,
+    ClientDuplicateReport,
+    ClientMergeResult,
+    ClientOutput,
+    ClientUpdateInput,
+)
+from server.schema.transaction_schema import (
+    TransactionCursor,
+    TransactionCursorPage,
+    TransactionFilters,
+)
+from server.utils.cache import transaction_page_cache
+from server.utils.pagination import decode_cursor
+from server.utils.types import SessionPayload
+from server.utils.utils import normalize_phone_br
+
+
+class _ClientService:
+    def __init__(self, db: DepDatabaseSession):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+        self.repository: _ClientRepository = ClientRepository(db)
+
+    async def get_clients(
+        self, user: SessionPayload, limit: int, term: Optional[str], cursor: Optional[str]
+    ) -> ClientCursorPage:
+        return await self.repository.get_clients(
+            limit, term, decode_cursor(cursor, ClientCursor) if cursor else None
+        )
+
+    async def get_client(self, user: SessionPayload, client_id: int) -> ClientOutput:
+        client = await self.repository.get_client(client_id)
+        if not client:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado."
+            )
+        return client
+
+    async def get_clients_by_phone(self, user: SessionPayload, phone: str) -> List[ClientOutput]:
+        normalized_phone = normalize_phone_br(phone)
+        if not normalized_phone:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Telefone inválido. Informe o DDD e o número.",
+            )
+        return await self.repository.get_clients_by_phone(normalized_phone)
+
+    async def get_client_transactions(
+        self, user: SessionPayload, client_id: int, limit: int, cursor: Optional[str]
+    ) -> TransactionCursorPage:
+        if not await self.repository.get_client_by_id(client_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado."
+            )
+        transaction_repository: _TransactionRepository = TransactionRepository(self.db)
+        return await transaction_repository.get_keyset_transactions(
+            limit,
+            TransactionFilters(client_id=client_id),
+            decode_cursor(cursor, TransactionCursor) if cursor else None,
+        )
+
+    async def update_client(
+        self, user: SessionPayload, client_id: int, data: ClientUpdateInput
+    ) -> ClientOutput:
+        client = await self.repository.get_client_by_id(client_id)
+        if not client:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Cliente não encontrado."
+            )
+        try:
+            await self.repository.update_client(
+                client, data.name, data.last_name, data.phone, user
+            )
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            if not isinstance(e, HTTPException):
+                self.logger.error(f"Error updating client {client_id}: {e}")
+            raise e
+        # Transaction listings show the client name and phone.
+        transaction_page_cache.bump()
+        return await self.get_client(user, client_id)
+
+    async def find_duplicate_clusters(
+        self, min_similarity: float, phone_min_similarity: float, max_block_size: int
+    ) -> ClientDuplicateReport:
+        """
+        Groups the candidate pairs into clusters (connected components). The client kept in
+        each cluster is the one holding the identity key, then the one with most transactions,
+        then the oldest. Clusters whose names are all the same once normalized come approved;
+        the others must be reviewed.
+        """
+        started = time.perf_counter()
+        clients = await self.repository.count_clients()
+        pairs, skipped_blocks = await self.repository.find_duplicate_client_pairs(
+            min_similarity, phone_min_similarity, max_block_size
+        )
+
+        parent: Dict[int, int] = {}
+
+        def find(client_id: int) -> int:
+            parent.setdefault(client_id, client_id)
+            while parent[client_id] != client_id:
+                parent[client_id] = parent[parent[client_id]]
+                client_id = parent[client_id]
+            return client_id
+
+        scores: Dict[int, float] = {}
+        for id_a, id_b, score in pairs:
+            root_a, root_b = find(id_a), find(id_b)
+            if root_a != root_b:
+                parent[root_b] = root_a
+                scores[root_a] = min(score, scores.get(root_a, 1.0), scores.get(root_b, 1.0))
+
+        members: Dict[int, List[int]] = defaultdict(list)
+        for client_id in parent:
+            members[find(client_id)].append(client_id)
+        found = await self.repository.get_clients_by_ids(list(parent))
+        rows = {row.Client.id_client: row for row in found}
+
+        clusters = []
+        for root, ids in members.items():
+            ranked = sorted(
+                (rows[client_id] for client_id in ids if client_id in rows),
+                key=lambda row: (
+                    row.Client.identity_key is None,
+                    -row.transaction_count,
+                    row.Client.id_client,
+                ),
+            )
+            if len(ranked) < 2:
+                continue
+            clusters.append(
+                ClientDuplicateCluster(
+                    keep_id=ranked[0].Client.id_client,
+                    ids=[row.Client.id_client for row in ranked],
+                    names=[f"{row.Client.name} {row.Client.last_name}" for row in ranked],
+                    score=round(scores.get(root, 1.0), 3),
+                    approved=len({row.sort_key for row in ranked}) == 1,
+                )
+            )
+        clusters.sort(key=lambda cluster: cluster.score)
+
+        elapsed = time.perf_counter() - started
+        self.logger.info(
+            f"Found {len(clusters)} duplicate clusters among {clients} clients in {elapsed:.2f}s"
+        )
+        return ClientDuplicateReport(
+            clients=clients,
+            clusters=clusters,
+            skipped_blocks=skipped_blocks,
+            elapsed_seconds=round(elapsed, 3),
+            seconds_per_100k_clients=round(elapsed / max(clients, 1) * 100_000, 3),
+        )
+
+    async def merge_duplicate_clusters(
+        self, user: SessionPayload, clusters: List[ClientDuplicateCluster], batch_size: int
+    ) -> ClientMergeResult:
+        started = time.perf_counter()
+        approved = [cluster for cluster in clusters if cluster.approved]
+        merges: Dict[int, int] = {}
+        for cluster in approved:
+            if cluster.keep_id not in cluster.ids:
+                raise ValueError(f"Cluster {cluster.ids} does not contain {cluster.keep_id}")
+            for client_id in cluster.ids:
+                if client_id == cluster.keep_id:
+                    continue
+                if client_id in merges:
+                    raise ValueError(f"Client {client_id} appears in more than one cluster")
+                merges[client_id] = cluster.keep_id
+        if set(merges) & set(merges.values()):
+            raise ValueError("A kept client is merged into another cluster")
+
+        transactions_moved = items_moved = 0
+        if merges:
+            transactions_moved, items_moved = await self.repository.merge_clients(
+                merges, user.id_user, batch_size
+            )
+            transaction_page_cache.bump()
+
+        elapsed = time.perf_counter() - started
+        self.logger.info(
+            f"Merged {len(merges)} clients into {len(approved)} by {user.username}, moving "
+            f"{transactions_moved} transactions in {elapsed:.2f}s"
+        )
+        return ClientMergeResult(
+            clusters=len(approved),
+            clients_merged=len(merges),
+            transactions_moved=transactions_moved,
+            items_moved=items_moved,
+            elapsed_seconds=round(elapsed, 3),
+        )
+
+
+ClientService = Annotated[_ClientService, Depends(_ClientService)]
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import List, Optional
+
+import psycopg
+
+from server.configuration.database import AsyncSessionLocal
+from server.configuration.environment import SETTINGS
+from server.repository.bottle_brand_repository import _BottleBrandRepository, bottle_brand_cache
+from server.schema.bottle_brand_schema import BottleBrandOutput
+from server.utils.cache import transaction_page_cache
+
+BOTTLE_BRAND_CHANNEL = "bottle_brand_changed"
+TRANSACTION_CHANNEL = "transaction_changed"
+
+
+def brand_catalog_etag(brands: List[BottleBrandOutput]) -> str:
+    # Derived from the content, so every worker hands out the same ETag.
+    payload = json.dumps([brand.model_dump() for brand in brands])
+    return f'"{hashlib.sha1(payload.encode()).hexdigest()}"'
+
+
+class BrandCatalog:
+    """
+    Per-worker snapshot of every bottle brand. It is reloaded whenever the
+    `bottle_brand_changed` notification (sent by a trigger on `bottle_brand`) arrives on a
+    dedicated LISTEN connection. While that connection is down the snapshot is dropped and
+    callers read from the database instead, so a missed notification never serves stale data.
+
+    The same connection relays `transaction_changed` (sent by triggers on
+    `client_bottle_transaction` and `client`) to `transaction_page_cache`, whatever worker or
+    job made the write, and keeps that cache disabled while it is down.
+    """
+
+    def __init__(self):
+        self.brands: Optional[List[BottleBrandOutput]] = None
+        self.etag: Optional[str] = None
+        self.logger = logging.getLogger(__name__)
+        self._task: Optional[asyncio.Task] = None
+
+    async def reload(self):
+        async with AsyncSessionLocal() as session:
+            brands = await _BottleBrandRepository(session).get_all_bottle_brands()
+        snapshot = [BottleBrandOutput.model_validate(brand) for brand in brands]
+        self.brands, self.etag = snapshot, brand_catalog_etag(snapshot)
+        bottle_brand_cache.clear()
+        transaction_page_cache.bump()
+        self.logger.info(f"Brand catalogue loaded with {len(snapshot)} brands")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.brands = self.etag = None
+        transaction_page_cache.enabled = False
+
+    async def _listen(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    SETTINGS.render_sqlalchemy_url("postgresql"), autocommit=True
+                ) as connection:
+                    # LISTEN before loading, so no change can slip in between.
+                    await connection.execute(f"LISTEN {BOTTLE_BRAND_CHANNEL}")
+                    await connection.execute(f"LISTEN {TRANSACTION_CHANNEL}")
+                    await self.reload()
+                    transaction_page_cache.enabled = True
+                    async for notify in connection.notifies():
+                        if notify.channel == TRANSACTION_CHANNEL:
+                            transaction_page_cache.bump()
+                        else:
+                            await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.brands = self.etag = None
+                transaction_page_cache.enabled = False
+                self.logger.error(f"Brand catalogue listener failed, retrying: {e}")
+                await asyncio.sleep(SETTINGS.bottle_brand_listen_retry_seconds)
+
+
+brand_catalog = BrandCatalog()
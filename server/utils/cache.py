@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Optional, Set, Tuple, TypeVar
+
+from server.configuration.environment import SETTINGS
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Process-local cache bounded by `maxsize` entries (least recently used are evicted
+    first) whose entries expire `ttl` seconds after being stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else default
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class VersionedCache(Generic[K, V]):
+    """
+    LRU/TTL cache whose entries are tagged with the data version they were computed
+    from. `bump()` after a write makes every stored entry stale at once; stale entries
+    are only handed out when the caller explicitly accepts them (serve-stale mode).
+
+    The version is local to the process, so writes made elsewhere must reach `bump()`
+    through a notification. The cache stays disabled (every lookup misses) until whoever
+    relays those notifications sets `enabled`, and must be disabled again when it stops.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries: TTLCache[K, Tuple[int, V]] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._revalidating: Set[K] = set()
+        self.enabled = False
+        self.version = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def bump(self):
+        self.version += 1
+
+    def get(self, key: K, allow_stale: bool = False) -> Tuple[Optional[V], bool]:
+        """
+        Returns `(value, is_fresh)`; `value` is None on a miss.
+        """
+        entry = self._entries.get(key) if self.enabled else None
+        if entry is not None:
+            version, value = entry
+            if version == self.version:
+                self.hits += 1
+                return value, True
+            if allow_stale:
+                self.stale_hits += 1
+                return value, False
+        self.misses += 1
+        return None, False
+
+    def set(self, key: K, value: V, version: int):
+        # `version` must be read before computing `value`, so a write that lands while
+        # the value is being computed leaves the entry stale instead of hiding it.
+        if self.enabled:
+            self._entries.set(key, (version, value))
+
+    def start_revalidation(self, key: K) -> bool:
+        if key in self._revalidating:
+            return False
+        self._revalidating.add(key)
+        return True
+
+    def finish_revalidation(self, key: K):
+        self._revalidating.discard(key)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "enabled": self.enabled,
+            "version": self.version,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+
+transaction_page_cache: VersionedCache = VersionedCache(
+    maxsize=SETTINGS.transaction_cache_size, ttl=SETTINGS.transaction_cache_ttl
+)
@@ -0,0 +1,28 @@
+import base64
+import json
+from typing import Type, TypeVar
+
+from fastapi import HTTPException, Query, status
+from fastapi_pagination import Params
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class UnboundedParams(Params):
+    """`Params` without the library's cap of 100 rows per page."""
+
+    size: int = Query(50, ge=1, description="Page size")
+
+
+def encode_cursor(cursor: BaseModel) -> str:
+    raw = cursor.model_dump_json().encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, model: Type[T]) -> T:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return model.model_validate(json.loads(raw))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido.")
@@ -1,7 +1,8 @@
 import calendar
 import logging
 import os
-from datetime import datetime
+from collections import defaultdict
+from datetime import date, datetime
 from io import BytesIO
 
 import boto3
@@ -14,10 +15,10 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
-from sqlalchemy import extract, select
+from sqlalchemy import func, select
 
 from server.configuration.database import DepDatabaseSession
-from server.model.client_bottle_transaction import ClientBottleTransaction
+from server.model.client_bottle_transaction_item import ClientBottleTransactionItem
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -80,21 +81,31 @@ async def generate_pdf(session: DepDatabaseSession):
     month_name = months_pt_br[current_month - 1]
 
     last_day = calendar.monthrange(current_year, current_month)[1]
-
-    query_active = select(ClientBottleTransaction).where(
-        ClientBottleTransaction.fl_active == True,
-        extract("month", ClientBottleTransaction.transaction_date) == current_month,
-    )
-    query_inactive = select(ClientBottleTransaction).where(
-        ClientBottleTransaction.fl_active == False,
-        extract("month", ClientBottleTransaction.transaction_date) == current_month,
+    month_start = date(current_year, current_month, 1)
+    month_end = date(current_year, current_month, last_day)
+
+    # Grouped on the indexed item table, bounded to the current month of the current year.
+    query = (
+        select(
+            ClientBottleTransactionItem.transaction_date,
+            ClientBottleTransactionItem.fl_active,
+            func.sum(ClientBottleTransactionItem.quantity).label("quantity"),
+        )
+        .where(
+            ClientBottleTransactionItem.transaction_date >= month_start,
+            ClientBottleTransactionItem.transaction_date <= month_end,
+        )
+        .group_by(
+            ClientBottleTransactionItem.transaction_date, ClientBottleTransactionItem.fl_active
+        )
     )
+    result = await session.execute(query)
 
-    result_active = await session.execute(query_active)
-    result_inactive = await session.execute(query_inactive)
-
-    transactions_active = result_active.scalars().all()
-    transactions_inactive = result_inactive.scalars().all()
+    daily_active = defaultdict(int)
+    daily_inactive = defaultdict(int)
+    for row in result.all():
+        daily = daily_active if row.fl_active else daily_inactive
+        daily[row.transaction_date.day] += row.quantity
 
     buffer = BytesIO()
     pdf = SimpleDocTemplate(buffer, pagesize=letter)
@@ -109,21 +120,8 @@ async def generate_pdf(session: DepDatabaseSession):
     cumulative_inactive = 0
 
     for day in days_in_month:
-        active_sum = sum(
-            item["quantity"]
-            for t in transactions_active
-            if t.transaction_date.day == day
-            for item in t.transaction_data_json
-        )
-        inactive_sum = sum(
-            item["quantity"]
-            for t in transactions_inactive
-            if t.transaction_date.day == day
-            for item in t.transaction_data_json
-        )
-
-        cumulative_active += active_sum
-        cumulative_inactive += inactive_sum
+        cumulative_active += daily_active[day]
+        cumulative_inactive += daily_inactive[day]
 
         active_counts.append(cumulative_active)
         inactive_counts.append(cumulative_inactive)
@@ -1,5 +1,6 @@
+import re
 import unicodedata
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from fastapi_pagination import Page
 from sqlalchemy import select
@@ -15,6 +16,26 @@ def normalize_string(input_str):
     return only_ascii.lower()
 
 
+def normalize_phone_br(phone: Optional[str]) -> Optional[str]:
+    """
+    Same rules as the `normalize_phone_br` SQL function that fills `client.phone_normalized`:
+    E.164 for Brazilian numbers with area code, None for anything else.
+    """
+    digits = re.sub(r"\D", "", phone or "").lstrip("0")
+    if len(digits) in (12, 13) and digits.startswith("55"):
+        return f"+{digits}"
+    if len(digits) in (10, 11):
+        return f"+55{digits}"
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
 async def get_first_record_as_dict(result) -> Dict:
     first_record = result.first()
     return dict(first_record._mapping) if first_record else {}
@@ -28,18 +49,39 @@ async def get_all_records_as_list(execution) -> list[Dict[str, Any]]:
 async def process_transaction_data(
     transactions: Page[TransactionOutput], db: DepDatabaseSession
 ) -> Page[TransactionOutput]:
-    for transaction in transactions.items:
-        if transaction.transaction_data:
-            for item in transaction.transaction_data:
-                brand_id = item.brand_id
-                if brand_id:
-                    brand_name = await get_bottle_brand_name(db, brand_id)
-                    if brand_name:
-                        item.brand_name = brand_name
+    await set_transaction_brand_names(transactions.items, db)
+    return transactions
+
+
+async def set_transaction_brand_names(
+    transactions: List[TransactionOutput], db: DepDatabaseSession
+) -> List[TransactionOutput]:
+    """
+    Brand names are stored with the items at write time, so only rows written before that
+    (and not backfilled yet) trigger a lookup.
+    """
+    missing = [
+        item
+        for transaction in transactions
+        for item in transaction.transaction_data or []
+        if item.brand_id and not item.brand_name
+    ]
+    if not missing:
+        return transactions
+    brand_names = await get_bottle_brand_names(db, {item.brand_id for item in missing})
+    for item in missing:
+        item.brand_name = brand_names.get(item.brand_id)
     return transactions
 
 
-async def get_bottle_brand_name(db: DepDatabaseSession, brand_id: int) -> Optional[str]:
-    query = select(BottleBrand.name).where(BottleBrand.id_bottle_brand == brand_id)
+async def get_bottle_brand_names(
+    db: DepDatabaseSession, brand_ids: Iterable[int]
+) -> Dict[int, str]:
+    brand_ids = list(set(brand_ids))
+    if not brand_ids:
+        return {}
+    query = select(BottleBrand.id_bottle_brand, BottleBrand.name).where(
+        BottleBrand.id_bottle_brand.in_(brand_ids)
+    )
     result = await db.execute(query)
-    return result.scalar()
+    return {row.id_bottle_brand: row.name for row in result.all()}